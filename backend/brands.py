@@ -0,0 +1,277 @@
+import logging
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from dotenv import load_dotenv
+from rapidfuzz import process, fuzz
+from backend.query_parser import STOP_PHRASES, MAX_PRICE_WORDS, MIN_PRICE_WORDS
+from indexing.category_normalizer import VARIANT_TO_CANONICAL
+from backend.log import get_logger, log_event
+
+load_dotenv()
+
+logger = get_logger("backend.brands")
+
+BRAND_SOURCE = os.getenv("BRAND_SOURCE", "es")  # "es" (terms of brand_normalized) or "postgres"
+BRAND_REFRESH_SECONDS = float(os.getenv("BRAND_REFRESH_SECONDS", "3600"))
+BRAND_FUZZY_THRESHOLD = int(os.getenv("BRAND_FUZZY_THRESHOLD", "80"))
+BRAND_MAX_CANDIDATES = int(os.getenv("BRAND_MAX_CANDIDATES", "25"))
+BRAND_MIN_FUZZY_LENGTH = int(os.getenv("BRAND_MIN_FUZZY_LENGTH", "4"))  # shorter brands must match exactly
+BRAND_MIN_LENGTH = int(os.getenv("BRAND_MIN_LENGTH", "2"))  # single-token brands shorter than this never match
+BRAND_MAX_WORDS = 4
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# query words that must never be read as a brand, even if some catalog brand is spelled that way
+BRAND_IGNORE_WORDS = set(STOP_PHRASES + MAX_PRICE_WORDS + MIN_PRICE_WORDS) | {"for", "the", "and", "with", "in", "of"}
+
+
+def normalize_brand(text: str) -> str:
+    return " ".join(_TOKEN_RE.findall(text.lower()))
+
+
+# product words (category names and variants): never fuzzy-matched to a
+# brand, so "shoes" is not read as a catalog brand "shoe"
+CATEGORY_WORDS = {normalize_brand(text) for text in VARIANT_TO_CANONICAL}
+
+COLOUR_WORDS = {
+    "black", "white", "red", "blue", "green", "yellow", "pink", "purple", "orange", "brown", "grey", "gray",
+    "maroon", "navy", "beige", "cream", "gold", "golden", "silver", "olive", "teal", "violet", "khaki",
+    "magenta", "peach", "mustard", "rust", "wine", "multi", "multicolor", "multicolour", "dark", "light",
+}
+
+# ordinary shopping words that are also spelled like some catalog brand
+# ("only", "max", "classic", "sports"): such a match may be the brand or
+# just the word, so it only boosts
+DESCRIPTIVE_WORDS = {
+    "only", "max", "classic", "casual", "formal", "sport", "sports", "running", "smart", "slim", "regular",
+    "fit", "cotton", "denim", "leather", "silk", "linen", "wool", "printed", "solid", "striped", "checked",
+    "party", "new", "latest", "best", "cheap", "premium", "style", "fashion", "comfort", "basic", "basics",
+    "plain", "soft", "long", "short", "full", "half", "sleeve", "urban", "street", "royal", "star", "home",
+    "kids", "active", "pro", "original", "classics", "trend", "trendy", "life", "lifestyle", "indian",
+    "india", "ethnic", "modern", "vintage", "sleek", "elegant", "cool", "super", "fresh", "free", "pure",
+}
+
+# single words that alone make a low-confidence brand match
+COMMON_WORDS = (
+    COLOUR_WORDS | DESCRIPTIVE_WORDS | BRAND_IGNORE_WORDS
+    | {token for text in CATEGORY_WORDS for token in text.split()}
+)
+
+
+def _trigrams(text: str) -> set[str]:
+    padded = f" {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# -----------------------------
+# LOADERS
+# -----------------------------
+
+def load_brands_from_es(client, index: str, page_size: int = 1000) -> list[str]:
+    """Every distinct brand_normalized value, paged with a composite aggregation."""
+    brands = []
+    after = None
+
+    while True:
+        composite = {"size": page_size, "sources": [{"brand": {"terms": {"field": "brand_normalized"}}}]}
+        if after:
+            composite["after"] = after
+
+        res = client.search(index=index, size=0, aggs={"brands": {"composite": composite}})
+        agg = res["aggregations"]["brands"]
+        brands.extend(bucket["key"]["brand"] for bucket in agg["buckets"])
+
+        after = agg.get("after_key")
+        if not after or not agg["buckets"]:
+            return brands
+
+
+def load_brands_from_postgres(table: str) -> list[str]:
+    from indexing.db import get_pg_connection
+
+    conn = get_pg_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT DISTINCT brand FROM {table} WHERE brand IS NOT NULL")
+            # same normalization as brand_normalized in indexing/index_products.py
+            return [brand.lower() for (brand,) in cur.fetchall()]
+    finally:
+        conn.close()
+
+
+# -----------------------------
+# MATCHING
+# -----------------------------
+
+class BrandIndex:
+    """
+    Immutable lookup structures for one brand list.
+
+    match() first looks for an exact (normalized) brand among the query's
+    word n-grams, then falls back to fuzzy matching: character trigrams
+    narrow the dictionary down to BRAND_MAX_CANDIDATES brands, and only
+    those are scored with rapidfuzz.
+
+    Only an exact match with at least one uncommon word is confident
+    enough to filter on. Exact matches made of common words only
+    ("only", "red", "smart casual") and every fuzzy match are returned as
+    low-confidence, for callers to boost on. Fuzzy matching skips n-grams
+    and brands containing common words ("sport" is not the brand
+    "sports"), and single-token brands shorter than BRAND_MIN_LENGTH never
+    match.
+    """
+
+    def __init__(self, brands):
+        self.by_key = {}                    # normalized text -> brand_normalized term
+        self.trigrams = defaultdict(list)   # trigram -> fuzzy-eligible keys
+
+        for brand in brands:
+            key = normalize_brand(brand)
+            if len(key) < BRAND_MIN_LENGTH or key in self.by_key:
+                continue
+            self.by_key[key] = brand
+
+        for key in self.by_key:
+            if len(key) >= BRAND_MIN_FUZZY_LENGTH and not _has_common_word(key):
+                for gram in _trigrams(key):
+                    self.trigrams[gram].append(key)
+
+        self.max_words = min(BRAND_MAX_WORDS, max((k.count(" ") + 1 for k in self.by_key), default=1))
+
+    def __len__(self):
+        return len(self.by_key)
+
+    def _ngrams(self, query: str):
+        # (normalized n-gram, (start, end) of the query span it came from), longest first
+        tokens = list(_TOKEN_RE.finditer(query))
+        for n in range(min(self.max_words, len(tokens)), 0, -1):
+            for i in range(len(tokens) - n + 1):
+                words = tokens[i:i + n]
+                text = " ".join(t.group() for t in words)
+                if text in BRAND_IGNORE_WORDS:
+                    continue
+                yield text, (words[0].start(), words[-1].end())
+
+    def _candidates(self, text: str) -> list[str]:
+        counts = Counter()
+        for gram in _trigrams(text):
+            counts.update(self.trigrams.get(gram, ()))
+        return [key for key, _ in counts.most_common(BRAND_MAX_CANDIDATES)]
+
+    def match(self, query: str, threshold: int = BRAND_FUZZY_THRESHOLD) -> tuple[str, tuple[int, int], bool] | None:
+        """(brand term, (start, end) span in the query, confident) or None."""
+        ngrams = list(self._ngrams(query.lower()))
+
+        # longest n-gram first; a confident match wins over a common-word one
+        common_hit = None
+        for text, span in ngrams:
+            if text in self.by_key:
+                if not _only_common_words(text):
+                    return self.by_key[text], span, True
+                common_hit = common_hit or (self.by_key[text], span, False)
+        if common_hit:
+            return common_hit
+
+        best = None
+        for text, span in ngrams:
+            if len(text) < BRAND_MIN_FUZZY_LENGTH or _has_common_word(text):
+                continue
+            candidates = self._candidates(text)
+            if not candidates:
+                continue
+            hit = process.extractOne(text, candidates, scorer=fuzz.ratio, score_cutoff=threshold)
+            if hit and (best is None or hit[1] > best[0]):
+                best = (hit[1], self.by_key[hit[0]], span)
+
+        return (best[1], best[2], False) if best else None
+
+
+def _has_common_word(text: str) -> bool:
+    return any(token in COMMON_WORDS for token in text.split())
+
+
+def _only_common_words(text: str) -> bool:
+    return all(token in COMMON_WORDS for token in text.split())
+
+
+class BrandDictionary:
+    """
+    Catalog brand list that is loaded on first use (or explicitly at
+    startup) and refreshed in the background. Until the first load has
+    finished, matching runs against `fallback`; match() never waits for it.
+    """
+
+    def __init__(self, loader, fallback=(), refresh_seconds: float = BRAND_REFRESH_SECONDS, on_change=None):
+        self._loader = loader
+        self._index = BrandIndex(fallback)
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._first_load = None  # background load started by match()
+        self._first_load_lock = threading.Lock()
+        self._refresh_seconds = refresh_seconds
+        self._on_change = on_change
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __len__(self):
+        return len(self._index)
+
+    def load(self) -> int:
+        index = BrandIndex(self._loader())
+        self._index = index
+        self._loaded = True
+        if self._on_change:
+            self._on_change()
+        log_event(logger, "brands_loaded", sample=False, brands=len(index), source=BRAND_SOURCE)
+        return len(index)
+
+    def ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            try:
+                self.load()
+            except Exception as e:
+                # keep serving with the fallback list; the refresher retries
+                log_event(
+                    logger, "brands_load_failed", level=logging.WARNING, sample=False,
+                    fallback_brands=len(self._index), error=repr(e)
+                )
+                self._loaded = True
+
+    def match(self, query: str) -> tuple[str, tuple[int, int], bool] | None:
+        if not self._loaded:
+            self._load_in_background()
+        return self._index.match(query)
+
+    def _load_in_background(self):
+        # called on the event loop: start the load, don't wait for it
+        with self._first_load_lock:
+            if self._first_load is None:
+                self._first_load = threading.Thread(target=self.ensure_loaded, name="brand-load", daemon=True)
+                self._first_load.start()
+
+    def start_refresh(self):
+        if self._thread is not None or self._refresh_seconds <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._refresh_loop, name="brand-refresh", daemon=True)
+        self._thread.start()
+
+    def stop_refresh(self):
+        self._stop.set()
+        self._thread = None
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self._refresh_seconds):
+            try:
+                self.load()
+            except Exception as e:
+                log_event(
+                    logger, "brands_refresh_failed", level=logging.WARNING, sample=False,
+                    brands=len(self._index), error=repr(e)
+                )
@@ -0,0 +1,158 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with a per-entry time-to-live.
+    maxsize <= 0 disables the cache (every get is a miss, set is a no-op).
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING or entry[0] < now:
+                if entry is not _MISSING:
+                    del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    # in-memory, never blocks: the async variants exist so callers can treat
+    # TTLCache and RedisCache alike on the event loop
+    async def get_async(self, key, default=None):
+        return self.get(key, default)
+
+    async def set_async(self, key, value):
+        self.set(key, value)
+
+    async def aclose(self):
+        pass
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
+
+
+class RedisCache:
+    """
+    Shared cache backend for running several API workers/pods against one
+    cache. Needs the optional `redis` package. Entries expire after `ttl`;
+    LRU eviction is the server's job (maxmemory-policy allkeys-lru).
+    Redis errors are treated as misses so the cache never fails a search.
+
+    get()/set() use the blocking client (sync search path and threadpool);
+    get_async()/set_async() use redis.asyncio and are what the event loop
+    must call.
+    """
+
+    def __init__(self, url: str, ttl: float, prefix: str = "search:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("RedisCache needs the `redis` package (pip install redis)") from e
+
+        self._errors = (redis.RedisError,)
+        self._url = url
+        self._client = redis.Redis.from_url(url)
+        self._async_client = None  # created on first use, inside the running loop
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, key: str) -> str:
+        return self.prefix + hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+
+    def get(self, key: str, default=None):
+        try:
+            raw = self._client.get(self._key(key))
+        except self._errors:
+            raw = None
+        return self._hit(raw, default)
+
+    def set(self, key: str, value):
+        try:
+            self._client.set(self._key(key), json.dumps(value), ex=max(1, int(self.ttl)))
+        except self._errors:
+            pass
+
+    def _hit(self, raw, default):
+        if raw is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return json.loads(raw)
+
+    def _get_async_client(self):
+        if self._async_client is None:
+            import redis.asyncio
+            self._async_client = redis.asyncio.Redis.from_url(self._url)
+        return self._async_client
+
+    async def get_async(self, key: str, default=None):
+        try:
+            raw = await self._get_async_client().get(self._key(key))
+        except self._errors:
+            raw = None
+        return self._hit(raw, default)
+
+    async def set_async(self, key: str, value):
+        try:
+            await self._get_async_client().set(self._key(key), json.dumps(value), ex=max(1, int(self.ttl)))
+        except self._errors:
+            pass
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "backend": "redis",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
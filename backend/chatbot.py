@@ -1,6 +1,5 @@
-from langchain_openai import ChatOpenAI
+import threading
 from langchain_core.tools import tool
-from langgraph.prebuilt import create_react_agent
 from backend.search import hybrid_search
 from dotenv import load_dotenv
 
@@ -20,7 +19,8 @@ def search_products(query: str, max_price: float = None, min_price: float = None
             max_price=max_price,
             min_price=min_price,
             brand=brand,
-            size=size
+            size=size,
+            source_fields=["title", "brand", "selling_price"]
         )
         
         # Extract and format the hits
@@ -44,9 +44,6 @@ def search_products(query: str, max_price: float = None, min_price: float = None
         traceback.print_exc()
         return f"Error executing search: {str(e)}"
 
-# Initialize the LLM
-llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
-
 # Create the LangGraph tool-calling ReAct agent
 tools = [search_products]
 
@@ -57,4 +54,20 @@ If the tool returns no products, apologize and suggest they change their filters
 If the user asks a general question, you can answer it cheerfully.
 """
 
-chat_graph = create_react_agent(llm, tools=tools, prompt=system_prompt)
+_chat_graph = None
+_chat_graph_lock = threading.Lock()
+
+
+def get_chat_graph():
+    """The agent, built on the first chat request (ChatOpenAI + LangGraph are slow to import)."""
+    global _chat_graph
+    if _chat_graph is None:
+        with _chat_graph_lock:
+            if _chat_graph is None:
+                from langchain_openai import ChatOpenAI
+                from langgraph.prebuilt import create_react_agent
+
+                # Initialize the LLM
+                llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
+                _chat_graph = create_react_agent(llm, tools=tools, prompt=system_prompt)
+    return _chat_graph
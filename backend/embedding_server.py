@@ -0,0 +1,112 @@
+import asyncio
+import json
+import os
+import signal
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from dotenv import load_dotenv
+from indexing.embeddings import load_model, set_num_threads, EMBEDDING_THREADS, EMBEDDING_BATCH_SIZE
+from indexing.remote_embeddings import EMBEDDING_SOCKET, encode_vectors, FRAME_HEADER
+from backend.embedding_service import EmbeddingBatcher, EMBED_BATCH_MAX_SIZE
+
+load_dotenv()
+
+# the backend that actually runs the model in this process
+EMBEDDING_SERVER_BACKEND = os.getenv("EMBEDDING_SERVER_BACKEND", "torch")
+
+
+class EmbeddingServer:
+    """
+    Dedicated embedding process for multi-worker deployments.
+
+    Loads the model once and serves encode requests from every API worker
+    on the box over a Unix socket; workers run with EMBEDDING_BACKEND=remote
+    and never import torch. Concurrent requests from all workers go through
+    one EmbeddingBatcher, so the model sees larger batches than any single
+    worker would produce.
+
+        EMBEDDING_THREADS=4 python -m backend.embedding_server
+    """
+
+    def __init__(self, path: str = EMBEDDING_SOCKET, backend: str = EMBEDDING_SERVER_BACKEND):
+        if backend == "remote":
+            raise ValueError("EMBEDDING_SERVER_BACKEND must be a local backend (torch, onnx, onnx-int8)")
+        self.path = path
+        set_num_threads(EMBEDDING_THREADS)
+        self.model = load_model(backend)
+        self.info = {"dims": self.model.get_sentence_embedding_dimension(), "backend": backend}
+        # single-query traffic is coalesced; bulk requests are already batches
+        self.batcher = EmbeddingBatcher(encode=self._encode)
+        self.bulk_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding-bulk")
+
+    def _encode(self, texts: list[str]) -> np.ndarray:
+        return np.ascontiguousarray(self.model.encode(
+            texts,
+            batch_size=EMBEDDING_BATCH_SIZE,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        ), dtype=np.float32)
+
+    async def _vectors(self, texts: list[str]) -> np.ndarray:
+        if len(texts) > EMBED_BATCH_MAX_SIZE:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.bulk_executor, self._encode, texts)
+        rows = await asyncio.gather(*(asyncio.wrap_future(self.batcher.submit(t)) for t in texts))
+        return np.asarray(rows, dtype=np.float32)
+
+    async def _respond(self, message: dict) -> bytes:
+        op = message.get("op")
+        if op == "info":
+            return b"J" + json.dumps(self.info).encode()
+        if op == "encode":
+            return encode_vectors(await self._vectors(message["texts"]))
+        return b"E" + f"unknown op {op!r}".encode()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    (length,) = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+                    message = json.loads(await reader.readexactly(length))
+                except asyncio.IncompleteReadError:
+                    return  # client went away
+
+                try:
+                    payload = await self._respond(message)
+                except Exception as e:
+                    payload = b"E" + str(e).encode()
+
+                writer.write(FRAME_HEADER.pack(len(payload)) + payload)
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # stale socket from a previous run
+
+        self.batcher.start()
+        self._encode(["warm up"])  # first encode pays lazy init; do it before accepting traffic
+        server = await asyncio.start_unix_server(self.handle, path=self.path)
+        os.chmod(self.path, 0o660)
+        print(f"[EMBEDDING SERVER] {self.info['backend']} model on {self.path} ({self.info['dims']} dims)")
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+
+        async with server:
+            await stop.wait()
+
+        self.batcher.stop()
+        self.bulk_executor.shutdown(wait=False)
+        os.unlink(self.path)
+
+
+def main():
+    asyncio.run(EmbeddingServer().serve())
+
+
+if __name__ == "__main__":
+    main()
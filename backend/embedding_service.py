@@ -0,0 +1,136 @@
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from dotenv import load_dotenv
+from indexing.embeddings import embed_texts
+
+load_dotenv()
+
+EMBED_BATCH_MAX_SIZE = int(os.getenv("EMBED_BATCH_MAX_SIZE", "32"))
+EMBED_BATCH_MAX_WAIT_MS = float(os.getenv("EMBED_BATCH_MAX_WAIT_MS", "2"))
+
+_STOP = object()
+
+
+class EmbeddingBatcher:
+    """
+    Coalesces concurrent single-text embedding calls into one encode.
+
+    A worker thread takes the first queued text, gathers up to
+    max_batch_size - 1 more for at most max_wait_ms, encodes them in one
+    embed_texts() call and resolves each caller's Future with its own
+    vector. The wait only applies while the previous batch had company, so
+    a lone request on an idle service is encoded immediately.
+    """
+
+    def __init__(
+        self,
+        max_batch_size: int = EMBED_BATCH_MAX_SIZE,
+        max_wait_ms: float = EMBED_BATCH_MAX_WAIT_MS,
+        encode=embed_texts
+    ):
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self._encode = encode
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+        # metrics
+        self.batches = 0
+        self.items = 0
+        self.batch_sizes = Counter()
+        self.max_queue_depth = 0
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def submit(self, text: str) -> Future:
+        if self._thread is None:
+            self.start()
+
+        future = Future()
+        self._queue.put((text, future))
+        self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        return future
+
+    def embed(self, text: str) -> list[float]:
+        return self.submit(text).result()
+
+    # -----------------------------
+    # WORKER
+    # -----------------------------
+
+    def _run(self):
+        last_batch_size = 1
+
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + (self.max_wait if last_batch_size > 1 else 0)
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self._encode_batch(batch)
+            last_batch_size = len(batch)
+
+            if stop:
+                return
+
+    def _encode_batch(self, batch):
+        batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        # identical concurrent queries are encoded once
+        unique = list(dict.fromkeys(text for text, _ in batch))
+
+        try:
+            vectors = self._encode(unique)
+        except BaseException as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        by_text = {text: vectors[i].tolist() for i, text in enumerate(unique)}
+        for text, future in batch:
+            future.set_result(by_text[text])
+
+        self.batches += 1
+        self.items += len(batch)
+        self.batch_sizes[len(batch)] += 1
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "max_queue_depth": self.max_queue_depth,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "batch_sizes": dict(sorted(self.batch_sizes.items()))
+        }
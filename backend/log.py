@@ -0,0 +1,78 @@
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))  # share of per-request events kept
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+_queue = queue.Queue(LOG_QUEUE_SIZE)
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, event, then the event's fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage()
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _DropWhenFull(logging.handlers.QueueHandler):
+    # never block a request on a backed-up log sink
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+def setup_logging():
+    """
+    Route the `backend` loggers through a queue: request code only enqueues,
+    a listener thread formats and writes to stderr. Idempotent.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    sink = logging.StreamHandler(sys.stderr)
+    sink.setFormatter(JsonFormatter())
+    _listener = logging.handlers.QueueListener(_queue, sink, respect_handler_level=False)
+    _listener.start()
+
+    root = logging.getLogger("backend")
+    root.setLevel(LOG_LEVEL)
+    root.addHandler(_DropWhenFull(_queue))
+    root.propagate = False
+
+
+def shutdown_logging():
+    global _listener
+    if _listener is not None:
+        _listener.stop()  # flushes what is queued
+        _listener = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(name)
+
+
+def log_event(logger: logging.Logger, event: str, level: int = logging.INFO, sample: bool = True, **fields):
+    """Structured event; per-request events (sample=True) are kept at LOG_SAMPLE_RATE."""
+    if sample and LOG_SAMPLE_RATE < 1.0 and random.random() >= LOG_SAMPLE_RATE:
+        return
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={"fields": fields})
@@ -1,15 +1,93 @@
-from fastapi import FastAPI, Query, Request
+from fastapi import FastAPI, Query, Request, HTTPException, Header
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse, PlainTextResponse, JSONResponse
+from pydantic import BaseModel, Field
+from contextlib import asynccontextmanager
+import asyncio
+import hmac
+import logging
+import os
 import time
 from typing import Optional, List
-from backend.search import hybrid_search
-from backend.chatbot import chat_graph
-from langchain_core.messages import HumanMessage, AIMessage
+from fastapi.concurrency import run_in_threadpool
+from backend.search import (
+    hybrid_search, hybrid_search_async, hybrid_search_batch_async, paginated_search_async, close_async_search,
+    close_pit_async, close_cursor_async, decode_cursor, brand_dictionary, CursorExpiredError, CURSOR_SECRET,
+    compact_hit, search_gauges, SEARCH_SOURCE_FIELDS, BATCH_MAX_QUERIES
+)
+from backend.metrics import registry, stage, start_request_timings, render_metrics, REQUEST_SECONDS, REQUESTS_TOTAL
+from backend.log import setup_logging, shutdown_logging, get_logger, log_event
+from backend.profiling import ADMIN_TOKEN, profile_python, summarize_es_profile
+from indexing.es_client import get_client, get_async_client, warm_up, warm_up_async
+from indexing.embeddings import warm_up_model
+# the chatbot (LangChain, LangGraph, ChatOpenAI) is imported on the first /chat request
+
+logger = get_logger("backend.api")
+registry.register_gauges(search_gauges)
+
+READY_RETRY_SECONDS = float(os.getenv("READY_RETRY_SECONDS", "2"))
+
+# flipped by the background warm-up; /ready answers 503 until both are True
+readiness = {"model": False, "es": False}
+
+
+async def _warm_up_es():
+    # open pooled connections now so the first requests don't pay TLS handshakes
+    while True:
+        opened = await warm_up_async(get_async_client())
+        if opened:
+            break
+        log_event(logger, "es_not_reachable", level=logging.WARNING, sample=False)
+        await asyncio.sleep(READY_RETRY_SECONDS)
+    opened_sync = await run_in_threadpool(warm_up, get_client())
+    log_event(logger, "es_warm_up", sample=False, async_connections=opened, sync_connections=opened_sync)
+
+    # catalog brands before going ready, then keep them fresh
+    await run_in_threadpool(brand_dictionary.ensure_loaded)
+    brand_dictionary.start_refresh()
+    readiness["es"] = True
+
+
+async def _warm_up_model():
+    # retried like ES: a remote embedding server may still be starting
+    start = time.perf_counter()
+    while True:
+        try:
+            await run_in_threadpool(warm_up_model)
+            break
+        except Exception as e:
+            log_event(logger, "model_not_ready", level=logging.WARNING, sample=False, error=repr(e))
+            await asyncio.sleep(READY_RETRY_SECONDS)
+    readiness["model"] = True
+    log_event(logger, "model_warm_up", sample=False, seconds=round(time.perf_counter() - start, 2))
+
+
+async def _warm_up():
+    results = await asyncio.gather(_warm_up_es(), _warm_up_model(), return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            log_event(logger, "warm_up_failed", level=logging.ERROR, sample=False, error=repr(result))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    setup_logging()
+    if not CURSOR_SECRET:
+        # a per-process key would make cursors fail on every other worker
+        raise RuntimeError("CURSOR_SECRET is not set; give every API worker the same random value")
+    # accept connections right away; /ready tells the load balancer when to send traffic
+    warm_up_task = asyncio.create_task(_warm_up())
+    yield
+    warm_up_task.cancel()
+    brand_dictionary.stop_refresh()
+    await close_async_search()
+    shutdown_logging()
+
 
 app = FastAPI(
     title="E-commerce Hybrid Search API & Chatbot",
-    description="BM25 + Vector Hybrid Search and AI Chatbot for E-commerce"
+    description="BM25 + Vector Hybrid Search and AI Chatbot for E-commerce",
+    lifespan=lifespan
 )
 
 # Allow requests from the Next.js frontend (localhost:3000)
@@ -25,11 +103,25 @@ app.add_middleware(
 @app.middleware("http")
 async def add_process_time_header(request: Request, call_next):
     start_time = time.perf_counter()
+    timings = start_request_timings()  # filled in by the search stages
     response = await call_next(request)
-    process_time = (time.perf_counter() - start_time) * 1000  # ms
+    elapsed = time.perf_counter() - start_time
+    process_time = elapsed * 1000  # ms
+
+    # route template, not the raw path, so unknown URLs can't blow up label cardinality
+    route = request.scope.get("route")
+    path = route.path if route is not None else "unmatched"
+    REQUEST_SECONDS.observe(elapsed, path=path)
+    REQUESTS_TOTAL.inc(path=path, status=response.status_code)
 
     response.headers["X-Process-Time-ms"] = f"{process_time:.2f}"
-    print(f"[API LATENCY] {request.url.path} = {process_time:.2f} ms")
+    log_event(
+        logger, "request",
+        path=path,
+        status=response.status_code,
+        ms=round(process_time, 2),
+        stages_ms=timings
+    )
 
     return response
 
@@ -39,50 +131,202 @@ def health_check():
     return {"status": "ok", "service": "ecommerce-search"}
 
 
-@app.get("/search")
-def search_products_ep(
-    q: str = Query(..., description="User search query"),
+@app.get("/ready")
+def readiness_check():
+    """200 once the embedding model and the ES connections are warm, 503 before."""
+    ready = all(readiness.values())
+    return JSONResponse({"ready": ready, **readiness}, status_code=200 if ready else 503)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_ep():
+    """Prometheus text exposition: stage/request histograms plus queue and cache gauges."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/search", response_class=ORJSONResponse)
+async def search_products_ep(
+    request: Request,
+    q: Optional[str] = Query(None, description="User search query (not needed with a cursor)"),
     max_price: Optional[float] = Query(None, description="Maximum selling price"),
     min_price: Optional[float] = Query(None, description="minimum selling price"),
     brand: Optional[str] = Query(None, description="Brand filter"),
-    size: int = Query(10, ge=1, le=50, description="Number of results to return")
+    category: Optional[str] = Query(None, description="Category filter"),
+    size: int = Query(10, ge=1, le=50, description="Number of results to return"),
+    knn_prefilter: Optional[bool] = Query(None, description="Apply filters inside the kNN clause (default: KNN_PREFILTER)"),
+    fusion: Optional[str] = Query(None, pattern="^(sum|rrf)$", description="Score fusion: sum or rrf (default: FUSION_MODE)"),
+    paginate: bool = Query(False, description="Return a next_cursor for browsing further pages"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page; other parameters are ignored"),
+    profile: bool = Query(False, description="Attach Python and ES profiles (needs X-Admin-Token)"),
+    x_admin_token: Optional[str] = Header(None)
 ):
     """
     Hybrid search endpoint:
     """
+    if not q and not cursor:
+        raise HTTPException(status_code=422, detail="Either `q` or `cursor` is required")
+    if profile:
+        if not ADMIN_TOKEN or not hmac.compare_digest(
+            (x_admin_token or "").encode("utf-8"), ADMIN_TOKEN.encode("utf-8")
+        ):
+            raise HTTPException(status_code=403, detail="Profiling needs a valid X-Admin-Token")
+        if paginate or cursor:
+            raise HTTPException(status_code=400, detail="`profile` cannot be combined with pagination")
+    if cursor:
+        try:
+            params = decode_cursor(cursor)["params"]
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        # echo the query the cursor continues
+        q, max_price, min_price, brand, category, size = (
+            params["query"], params["max_price"], params["min_price"], params["brand"], params["category"],
+            params["size"]
+        )
+
+    profile_report = None
     try:
-        res = hybrid_search(
-            query=q,
-            max_price=max_price,
-            min_price=min_price,
-            brand=brand, 
-            size=size
+        if profile:
+            # sync path on one worker thread, so the profiler sees only this request
+            res, python_profile = await run_in_threadpool(
+                profile_python,
+                hybrid_search,
+                query=q,
+                max_price=max_price,
+                min_price=min_price,
+                brand=brand,
+                category=category,
+                size=size,
+                knn_prefilter=knn_prefilter,
+                fusion=fusion,
+                source_fields=SEARCH_SOURCE_FIELDS,
+                es_profile=True
+            )
+            es_profile = res.pop("profile", {})
+            profile_report = {
+                "python": python_profile,
+                "es": {"summary": summarize_es_profile(es_profile), "profile": es_profile}
+            }
+        elif paginate or cursor:
+            res = await paginated_search_async(
+                query=q,
+                max_price=max_price,
+                min_price=min_price,
+                brand=brand,
+                category=category,
+                size=size,
+                knn_prefilter=knn_prefilter,
+                source_fields=SEARCH_SOURCE_FIELDS,
+                cursor=cursor
+            )
+            # nobody will ask for the next page: release the PIT now instead of at keep_alive
+            if res["next_cursor"] and await request.is_disconnected():
+                await close_cursor_async(res["next_cursor"])
+                res["next_cursor"] = None
+        else:
+            res = await hybrid_search_async(
+                query=q,
+                max_price=max_price,
+                min_price=min_price,
+                brand=brand,
+                category=category,
+                size=size,
+                knn_prefilter=knn_prefilter,
+                fusion=fusion,
+                source_fields=SEARCH_SOURCE_FIELDS
+            )
+        with stage("serialize"):
+            hits = res.get("hits", {}).get("hits", [])
+            results = [compact_hit(hit) for hit in hits[:size]]
+
+            body = {
+                "query": q,
+                "filters": {"max_price": max_price, "min_price": min_price, "brand": brand, "category": category},
+                "count": len(results),
+                "knn": res.get("knn"),
+                "fusion": res.get("fusion"),
+                "results": results
+            }
+            if "next_cursor" in res:
+                body["next_cursor"] = res["next_cursor"]
+            if profile_report is not None:
+                body["profile"] = profile_report
+
+            # returned directly so FastAPI skips jsonable_encoder; orjson does the rest
+            return ORJSONResponse(body)
+    except CursorExpiredError as e:
+        raise HTTPException(status_code=410, detail=str(e))
+    except Exception as e:
+        import traceback
+        return ORJSONResponse({"error": str(e), "traceback": traceback.format_exc()})
+
+
+@app.delete("/search/cursor")
+async def close_cursor_ep(cursor: str = Query(..., description="next_cursor to release")):
+    """Release the point-in-time behind a cursor the client is done with."""
+    try:
+        state = decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    await close_pit_async(state["pit_id"])
+    return {"closed": True}
+
+# ---- BATCH SEARCH ENDPOINT ----
+
+class SearchQuery(BaseModel):
+    q: str
+    max_price: Optional[float] = None
+    min_price: Optional[float] = None
+    brand: Optional[str] = None
+    category: Optional[str] = None
+    size: int = Field(10, ge=1, le=50)
+
+class BatchSearchRequest(BaseModel):
+    queries: List[SearchQuery] = Field(..., min_length=1, max_length=BATCH_MAX_QUERIES)
+    knn_prefilter: Optional[bool] = None
+    fusion: Optional[str] = Field(None, pattern="^(sum|rrf)$")
+
+@app.post("/search/batch", response_class=ORJSONResponse)
+async def search_batch_ep(req: BatchSearchRequest):
+    """
+    Many hybrid searches in one call: one embedding batch, one msearch.
+    Responses are in request order; a failed query carries an "error" instead of results.
+    """
+    try:
+        batch = await hybrid_search_batch_async(
+            [
+                {"query": item.q, "max_price": item.max_price, "min_price": item.min_price,
+                 "brand": item.brand, "category": item.category, "size": item.size}
+                for item in req.queries
+            ],
+            knn_prefilter=req.knn_prefilter,
+            fusion=req.fusion,
+            source_fields=SEARCH_SOURCE_FIELDS
         )
-        print(f"[ES LATENCY] took = {res.get('took', 0)} ms")
-        
-        hits = res.get("hits", {}).get("hits", [])
-        results = []
-        for hit in hits[:size]:
-            src = hit.get("_source", {})
-            results.append({
-                "title": src.get("title"),
-                "brand": src.get("brand"),
-                "category": src.get("category"),
-                "colour": src.get("colour"),
-                "selling_price": src.get("selling_price"),
-                "star_rating": src.get("star_rating"),
-                "score": hit.get("_score")
-            })
+    except Exception as e:
+        import traceback
+        return ORJSONResponse({"error": str(e), "traceback": traceback.format_exc()})
 
-        return {
-            "query": q,
-            "filters": {"max_price": max_price, "min_price": min_price, "brand": brand},
+    with stage("serialize"):
+        return ORJSONResponse({"count": len(batch), "responses": _batch_responses(req.queries, batch)})
+
+
+def _batch_responses(queries: List[SearchQuery], batch: List[dict]) -> List[dict]:
+    responses = []
+    for item, res in zip(queries, batch):
+        filters = {"max_price": item.max_price, "min_price": item.min_price, "brand": item.brand, "category": item.category}
+        if "error" in res:
+            responses.append({"query": item.q, "filters": filters, "error": res["error"]})
+            continue
+        results = [compact_hit(hit) for hit in res.get("hits", {}).get("hits", [])[:item.size]]
+        responses.append({
+            "query": item.q,
+            "filters": filters,
             "count": len(results),
+            "knn": res.get("knn"),
+            "fusion": res.get("fusion"),
             "results": results
-        }
-    except Exception as e:
-        import traceback
-        return {"error": str(e), "traceback": traceback.format_exc()}
+        })
+    return responses
 
 # ---- CHATBOT ENDPOINT ----
 
@@ -98,6 +342,9 @@ def chat_endpoint(req: ChatRequest):
     """
     Conversational endpoint that uses LangGraph and OpenAI to answer queries using tool calling.
     """
+    from langchain_core.messages import HumanMessage, AIMessage
+    from backend.chatbot import get_chat_graph
+
     # Convert dicts to LangChain message classes
     lc_messages = []
     for m in req.messages:
@@ -108,7 +355,7 @@ def chat_endpoint(req: ChatRequest):
             
     # Invoke the agent with the message history
     try:
-        response = chat_graph.invoke({"messages": lc_messages})
+        response = get_chat_graph().invoke({"messages": lc_messages})
         # The last message in the list is the final AI response
         last_message = response["messages"][-1]
         
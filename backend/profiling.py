@@ -0,0 +1,111 @@
+import cProfile
+import io
+import os
+import pstats
+import re
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")  # empty: ?profile=1 is refused
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.0005"))  # pyinstrument sampling interval, seconds
+PROFILE_TOP_FUNCTIONS = int(os.getenv("PROFILE_TOP_FUNCTIONS", "25"))  # cProfile fallback report length
+
+# Lucene query types behind the `knn` clause / retriever across ES 8.x
+_KNN_TYPES = re.compile(r"Knn|DocAndScoreQuery|VectorSimilarityQuery")
+_TEXT_FIELDS = re.compile(r"\b(title|product_details):")
+
+
+# -----------------------------
+# PYTHON SIDE
+# -----------------------------
+
+def profile_python(fn, *args, **kwargs):
+    """
+    Run fn(*args, **kwargs) under a profiler on the calling thread.
+    Returns (result, report). Uses the pyinstrument sampling profiler if it
+    is installed, otherwise cProfile (deterministic, noticeably more overhead).
+    """
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        return _profile_cprofile(fn, *args, **kwargs)
+
+    profiler = Profiler(interval=PROFILE_INTERVAL)
+    profiler.start()
+    try:
+        result = fn(*args, **kwargs)
+    finally:
+        profiler.stop()
+
+    return result, {
+        "profiler": "pyinstrument",
+        "duration_ms": round(profiler.last_session.duration * 1000, 3),
+        "report": profiler.output_text(unicode=False, color=False)
+    }
+
+
+def _profile_cprofile(fn, *args, **kwargs):
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        result = fn(*args, **kwargs)
+    finally:
+        profiler.disable()
+
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    stats.sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+    return result, {
+        "profiler": "cProfile",
+        "duration_ms": round(stats.total_tt * 1000, 3),
+        "report": out.getvalue()
+    }
+
+
+# -----------------------------
+# ELASTICSEARCH SIDE
+# -----------------------------
+
+def _classify(node: dict, totals: dict):
+    """Attribute a profiled Lucene query (sub)tree to bm25 / knn / filter time."""
+    nanos = node.get("time_in_nanos", 0)
+    if _KNN_TYPES.search(node.get("type", "")):
+        totals["knn"] += nanos
+        return
+    children = node.get("children", [])
+    if _TEXT_FIELDS.search(node.get("description", "")) and not any(
+        _KNN_TYPES.search(child.get("type", "")) for child in children
+    ):
+        totals["bm25"] += nanos
+        return
+    if not children:
+        totals["filter"] += nanos
+        return
+
+    # a parent's own time is what its children don't account for
+    totals["other"] += max(0, nanos - sum(child.get("time_in_nanos", 0) for child in children))
+    for child in children:
+        _classify(child, totals)
+
+
+def summarize_es_profile(profile: dict) -> dict:
+    """
+    Time spent in BM25 vs kNN (vs filters) summed over shards, from the
+    Profile API output. Query-level kNN shows up in the query tree; the
+    kNN retriever / top-level knn runs in the DFS phase and is counted there.
+    """
+    totals = {"bm25": 0, "knn": 0, "filter": 0, "other": 0, "rewrite": 0, "collector": 0}
+    shards = profile.get("shards", [])
+
+    for shard in shards:
+        for search in shard.get("searches", []):
+            for query in search.get("query", []):
+                _classify(query, totals)
+            totals["rewrite"] += search.get("rewrite_time", 0)
+            totals["collector"] += sum(c.get("time_in_nanos", 0) for c in search.get("collector", []))
+
+        for knn in shard.get("dfs", {}).get("knn", []):
+            totals["knn"] += sum(q.get("time_in_nanos", 0) for q in knn.get("query", []))
+            totals["knn"] += knn.get("rewrite_time", 0)
+
+    summary = {f"{name}_ms": round(nanos / 1e6, 3) for name, nanos in totals.items()}
+    summary["shards"] = len(shards)
+    return summary
@@ -0,0 +1,148 @@
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable
+
+# -----------------------------
+# VOCABULARY
+# -----------------------------
+
+MAX_PRICE_WORDS = ["under", "below", "less than", "upto", "up to"]
+MIN_PRICE_WORDS = ["above", "over", "more than", "greater than"]
+
+STOP_PHRASES = ["for men", "for women", "for man", "for woman", "men", "man", "women", "woman", "mens", "womens",
+                "for me", "me", "for boys", "for girls", "for boy", "for girl", "boys", "girls", "boy", "girl",
+                "for wedding", "for weddings", "wedding"]
+
+
+def _alternation(words) -> str:
+    # longest first so "for weddings" wins over "for wedding" at the same position
+    return "|".join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+
+
+# One regex for every filter phrase, compiled once at import
+_FILTER_RE = re.compile(
+    rf"(?P<max>(?:{'|'.join(MAX_PRICE_WORDS)})\s*₹?\s*(?P<max_val>\d+))"
+    rf"|(?P<min>(?:{'|'.join(MIN_PRICE_WORDS)})\s*₹?\s*(?P<min_val>\d+))"
+    rf"|\b(?:{_alternation(STOP_PHRASES)})\b"
+)
+
+
+# -----------------------------
+# PARSE RESULT
+# -----------------------------
+
+@dataclass(frozen=True)
+class ParsedQuery:
+    query: str
+    brand: str | None
+    min_price: float | None
+    max_price: float | None
+    cleaned_query: str
+    category: str | None = None
+    # True when the category was only fuzzy-matched from the query: boost, don't filter
+    category_inferred: bool = False
+    # True for a low-confidence brand match (common word, fuzzy): boost, don't filter
+    brand_inferred: bool = False
+
+
+# (brand term, (start, end) span of the query, confident) or None
+BrandResolver = Callable[[str], tuple[str, tuple[int, int] | None, bool] | None]
+# (canonical category_normalized value, exact match) or None
+CategoryResolver = Callable[[str], tuple[str, bool] | None]
+
+
+class QueryParser:
+    """
+    Single-pass query understanding: brand, price bounds and stop phrases.
+
+    The query is lowercased once, the brand resolver runs once, and a
+    single finditer over the combined regex yields both the price bounds
+    and the spans to drop from the cleaned text. Category intent, if a
+    resolver is given, is matched against that cleaned text. Results are
+    immutable and memoized per (query, brand, max_price, min_price, category).
+    """
+
+    def __init__(
+        self,
+        brand_resolver: BrandResolver,
+        category_resolver: CategoryResolver | None = None,
+        cache_size: int = 10000
+    ):
+        self._brand_resolver = brand_resolver
+        self._category_resolver = category_resolver
+        self._parse_cached = lru_cache(maxsize=cache_size)(self._parse)
+
+    def parse(
+        self,
+        query: str,
+        brand: str | None = None,
+        max_price: float | None = None,
+        min_price: float | None = None,
+        category: str | None = None
+    ) -> ParsedQuery:
+        return self._parse_cached(query, brand, max_price, min_price, category)
+
+    def clear_cache(self):
+        # call when the brand dictionary changes
+        self._parse_cached.cache_clear()
+
+    def cache_info(self):
+        return self._parse_cached.cache_info()
+
+    def _parse(self, query, brand, max_price, min_price, category) -> ParsedQuery:
+        q = query.lower()
+
+        brand_inferred = False
+        if brand:
+            resolved_brand = brand.lower()
+            m = re.search(rf"\b{re.escape(resolved_brand)}\b", q)
+            span = m.span() if m else None
+        else:
+            match = self._brand_resolver(q)
+            resolved_brand, span, confident = match if match else (None, None, True)
+            brand_inferred = not confident
+
+        # only the matched occurrence is cut, never the same text inside other
+        # words; a low-confidence match may just be a word, so it stays searchable
+        if span and not brand_inferred:
+            q = q[:span[0]] + " " + q[span[1]:]
+
+        matches = list(_FILTER_RE.finditer(q))
+
+        # explicit bounds win; otherwise the first phrase in the query
+        if not max_price:
+            max_price = next((float(m["max_val"]) for m in matches if m["max"]), None)
+        if not min_price:
+            min_price = next((float(m["min_val"]) for m in matches if m["min"]), None)
+
+        parts = []
+        last = 0
+        for m in matches:
+            # price phrases are only dropped when they are the bound we filter on
+            if m["max"] and not (max_price and int(m["max_val"]) == int(max_price)):
+                continue
+            if m["min"] and not (min_price and int(m["min_val"]) == int(min_price)):
+                continue
+            parts.append(q[last:m.start()])
+            last = m.end()
+        parts.append(q[last:])
+        cleaned_query = " ".join("".join(parts).split())
+
+        category_inferred = False
+        if not category and self._category_resolver:
+            match = self._category_resolver(cleaned_query)
+            if match:
+                category, exact = match
+                category_inferred = not exact
+
+        return ParsedQuery(
+            query=query,
+            brand=resolved_brand,
+            min_price=min_price,
+            max_price=max_price,
+            cleaned_query=cleaned_query,
+            category=category,
+            category_inferred=category_inferred,
+            brand_inferred=brand_inferred
+        )
@@ -1,28 +1,96 @@
-from elasticsearch import Elasticsearch
-from indexing.embeddings import embed_text
+from elasticsearch import NotFoundError
+from indexing.es_client import get_client, get_async_client
+from indexing.embeddings import embed_text, embed_texts
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import math
 import os
 import re
+import time
 from dotenv import load_dotenv
 from rapidfuzz import process, fuzz
-from indexing.category_normalizer import CATEGORY_MAP
+from indexing.category_normalizer import normalize_category, resolve_category_from_query
+from backend.cache import TTLCache, RedisCache
+from backend.embedding_service import EmbeddingBatcher
+from backend.query_parser import QueryParser, ParsedQuery
+from backend.brands import BrandDictionary, BRAND_SOURCE, load_brands_from_es, load_brands_from_postgres
+from backend.metrics import stage, record_stage
+from backend.log import get_logger, log_event
 
 load_dotenv()
 
-ELASTIC_USERNAME = "elastic"
-ELASTIC_PASSWORD = os.getenv("ELASTIC_PASSWORD")
-
-es = Elasticsearch(
-    "https://localhost:9200",
-    basic_auth=(ELASTIC_USERNAME, ELASTIC_PASSWORD),
-    verify_certs=False
-)
-
-INDEX_NAME = os.environ['INDEX_NAME']
+logger = get_logger("backend.search")
+
+# shared, pooled clients (see indexing/es_client.py)
+es = get_client()
+
+INDEX_NAME = os.environ['INDEX_NAME']  # read alias, swapped by indexing/reindex.py
+
+QUERY_VECTOR_CACHE_ENABLED = os.getenv("QUERY_VECTOR_CACHE_ENABLED", "true").lower() == "true"
+QUERY_VECTOR_CACHE_SIZE = int(os.getenv("QUERY_VECTOR_CACHE_SIZE", "10000"))
+QUERY_VECTOR_CACHE_TTL = float(os.getenv("QUERY_VECTOR_CACHE_TTL", "3600"))  # seconds
+
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "5000"))
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "60"))  # seconds
+RESULT_CACHE_URL = os.getenv("RESULT_CACHE_URL")  # e.g. redis://localhost:6379/0 to share across workers
+INDEX_VERSION_CHECK_INTERVAL = float(os.getenv("INDEX_VERSION_CHECK_INTERVAL", "10"))  # seconds
+
+EMBEDDING_EXECUTOR_THREADS = int(os.getenv("EMBEDDING_EXECUTOR_THREADS", "2"))
+EMBEDDING_BATCHING_ENABLED = os.getenv("EMBEDDING_BATCHING_ENABLED", "true").lower() == "true"
+
+QUERY_PARSE_CACHE_SIZE = int(os.getenv("QUERY_PARSE_CACHE_SIZE", "10000"))
+
+CATEGORY_INTENT_ENABLED = os.getenv("CATEGORY_INTENT_ENABLED", "false").lower() == "true"
+CATEGORY_MATCH_THRESHOLD = int(os.getenv("CATEGORY_MATCH_THRESHOLD", "85"))
+CATEGORY_BOOST = float(os.getenv("CATEGORY_BOOST", "2.0"))  # should-clause boost for an inferred category
+BRAND_BOOST = float(os.getenv("BRAND_BOOST", "2.0"))  # should-clause boost for a low-confidence brand match
+
+# filters inside the knn clause (pre-filtering) instead of only in bool.filter (post-filtering)
+KNN_PREFILTER = os.getenv("KNN_PREFILTER", "true").lower() == "true"
+
+# kNN sizing: fixed values, or derived per request from size, filter selectivity and a recall target
+KNN_K = int(os.getenv("KNN_K", "200"))
+KNN_NUM_CANDIDATES = int(os.getenv("KNN_NUM_CANDIDATES", "500"))
+KNN_ADAPTIVE = os.getenv("KNN_ADAPTIVE", "true").lower() == "true"
+KNN_K_PER_RESULT = float(os.getenv("KNN_K_PER_RESULT", "4"))
+KNN_MIN_K = int(os.getenv("KNN_MIN_K", "10"))
+KNN_MAX_K = int(os.getenv("KNN_MAX_K", "200"))
+KNN_MAX_NUM_CANDIDATES = int(os.getenv("KNN_MAX_NUM_CANDIDATES", "1000"))
+KNN_RECALL_TARGET = float(os.getenv("KNN_RECALL_TARGET", "0.95"))
+# "sum": BM25 + kNN scores added in one bool query; "rrf": reciprocal-rank fusion of two retrievers
+FUSION_MODES = ("sum", "rrf")
+FUSION_MODE = os.getenv("FUSION_MODE", "sum")
+RRF_RANK_WINDOW = int(os.getenv("RRF_RANK_WINDOW", "50"))
+RRF_RANK_CONSTANT = int(os.getenv("RRF_RANK_CONSTANT", "60"))
+# Response projection: only what the endpoints render, never the 384-float embedding
+SEARCH_SOURCE_FIELDS = ["title", "brand", "category", "colour", "selling_price", "star_rating"]
+SEARCH_FILTER_PATH = ["took", "timed_out", "hits.total", "hits.hits._id", "hits.hits._score", "hits.hits._source"]
+MSEARCH_FILTER_PATH = [f"responses.{path}" for path in SEARCH_FILTER_PATH] + ["responses.error", "responses.status"]
+
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", "50"))
+
+# Cursor pagination: a point-in-time per browsing session, renewed on every page
+PIT_KEEP_ALIVE = os.getenv("PIT_KEEP_ALIVE", "2m")
+PIT_SORT = [{"_score": "desc"}, {"_shard_doc": "asc"}]  # _shard_doc: cheap, stable tiebreaker within a PIT
+PAGINATION_FILTER_PATH = SEARCH_FILTER_PATH + ["pit_id", "hits.hits.sort"]
+PAGE_MAX_SIZE = 50  # same cap as /search?size
+# Cursors are HMAC-signed with this key. Every worker and every instance behind
+# the load balancer must verify the others' cursors, so it has no default: the
+# API refuses to start without it (backend/main.py).
+CURSOR_SECRET = os.getenv("CURSOR_SECRET", "").encode()
+
+FILTER_COUNT_CACHE_TTL = float(os.getenv("FILTER_COUNT_CACHE_TTL", "300"))  # seconds
 
 # -----------------------------
 # BRAND RESOLUTION (FUZZY)
 # -----------------------------
 
+# seed list until the catalog brands are loaded; resolve_brand_fuzzy() is the old reference matcher
 KNOWN_BRANDS = [
     "nike", "adidas", "campus", "puma", "reebok", "skechers"
 ]
@@ -42,35 +110,14 @@ def resolve_brand_fuzzy(query: str, threshold: int = 80) -> str | None:
 # CATEGORY RESOLUTION (QUERY INTENT)
 # -----------------------------
 
-# def resolve_category_from_query(query: str, threshold: int = 80) -> str | None:
-#     q = query.lower()
-
-#     best_category = None
-#     best_score = 0
-
-#     for canonical, variants in CATEGORY_MAP.items():
-#         # Score canonical name
-#         canonical_text = canonical.replace("_", " ")
-#         score = fuzz.partial_ratio(q, canonical_text)
-
-#         if score > best_score:
-#             best_score = score
-#             best_category = canonical
-
-#         #Score all variants
-#         for v in variants:
-#             v_score = fuzz.partial_ratio(q, v.lower())
-
-#             if v_score > best_score:
-#                 best_score = v_score
-#                 best_category = canonical
-
-#     # Apply threshold
-#     if best_score >= threshold:
-#         return best_category
-
-#     return None
+# Exact n-gram lookup, then whole-word fuzzy matching, over every canonical
+# category and variant lives in indexing/category_normalizer.py
+# (resolve_category_from_query). Exact matches filter, fuzzy ones boost.
 
+def _resolve_category(cleaned_query: str) -> tuple[str, bool] | None:
+    if not CATEGORY_INTENT_ENABLED:
+        return None
+    return resolve_category_from_query(cleaned_query, CATEGORY_MATCH_THRESHOLD)
 
 
 # -----------------------------
@@ -135,105 +182,955 @@ def clean_query(
     return " ".join(q.split())
 
 
+# -----------------------------
+# QUERY EMBEDDING (CACHED)
+# -----------------------------
+
+query_vector_cache = TTLCache(QUERY_VECTOR_CACHE_SIZE, QUERY_VECTOR_CACHE_TTL)
+
+# concurrent queries are encoded together (see backend/embedding_service.py)
+embedding_batcher = EmbeddingBatcher()
+
+
+def _embed_query(cleaned_query: str) -> list[float]:
+    if EMBEDDING_BATCHING_ENABLED:
+        return embedding_batcher.embed(cleaned_query)
+    return embed_text(cleaned_query)
+
+
+def get_query_vector(cleaned_query: str, inline: bool = False) -> list[float]:
+    # cached vectors are shared between requests: do not mutate them
+    # inline: encode on the calling thread, skipping the cache and the batcher
+    # thread, so a profiler on this thread sees the embedding work
+    with stage("embedding"):
+        if inline:
+            return embed_text(cleaned_query)
+        if not QUERY_VECTOR_CACHE_ENABLED:
+            return _embed_query(cleaned_query)
+
+        vector = query_vector_cache.get(cleaned_query)
+        if vector is None:
+            vector = _embed_query(cleaned_query)
+            query_vector_cache.set(cleaned_query, vector)
+        return vector
+
+
+# -----------------------------
+# RESULT CACHE
+# -----------------------------
+
+def _make_result_cache():
+    if RESULT_CACHE_URL:
+        return RedisCache(RESULT_CACHE_URL, RESULT_CACHE_TTL)
+    return TTLCache(RESULT_CACHE_SIZE, RESULT_CACHE_TTL)
+
+
+result_cache = _make_result_cache()
+
+_index_version = {"value": None, "checked_at": 0.0}
+
+
+def _index_version_is_stale() -> bool:
+    return (
+        _index_version["value"] is None
+        or time.monotonic() - _index_version["checked_at"] > INDEX_VERSION_CHECK_INTERVAL
+    )
+
+
+def _set_index_version(settings):
+    version = ",".join(sorted(
+        f"{name}:{s['settings']['index']['uuid']}" for name, s in settings.items()
+    ))
+
+    # no cache flush: the version is part of every result cache key, so
+    # entries for the old index simply stop being read and expire
+    if _index_version["value"] not in (None, version):
+        log_event(logger, "index_version_changed", sample=False, index_version=version)
+
+    _index_version["value"] = version
+    _index_version["checked_at"] = time.monotonic()
+
+
+def current_index_version() -> str:
+    """
+    Concrete index name + uuid behind INDEX_NAME, re-checked every
+    INDEX_VERSION_CHECK_INTERVAL seconds. Part of every result cache key,
+    so an alias swap or index rebuild invalidates cached results.
+    """
+    if _index_version_is_stale():
+        _set_index_version(es.indices.get_settings(index=INDEX_NAME, name="index.uuid"))
+    return _index_version["value"]
+
+
+def result_cache_key(index_version: str, parsed: ParsedQuery, **options) -> str:
+    # keyed on the query-understanding output, not the raw query string
+    return json.dumps(
+        [
+            index_version, parsed.cleaned_query, parsed.brand, parsed.brand_inferred,
+            parsed.category, parsed.category_inferred,
+            parsed.min_price, parsed.max_price, sorted(options.items())
+        ],
+        separators=(",", ":")
+    )
+
+
+def source_filter(source_fields: list[str] | None) -> dict:
+    # None keeps every stored field except the vector
+    return {"excludes": ["embedding"]} if source_fields is None else {"includes": source_fields}
+
+
+def compact_hit(hit: dict, fields: list[str] = SEARCH_SOURCE_FIELDS) -> dict:
+    """One flat result object: the projected _source fields plus the score."""
+    src = hit.get("_source", {})
+    result = {field: src.get(field) for field in fields}
+    result["score"] = hit.get("_score")
+    return result
+
+
 # -----------------------------
 # HYBRID SEARCH (PRODUCTION)
 # -----------------------------
 
-def hybrid_search(
+def _load_catalog_brands() -> list[str]:
+    if BRAND_SOURCE == "postgres":
+        return load_brands_from_postgres(os.environ["TABLE_NAME"])
+    return load_brands_from_es(es, INDEX_NAME)
+
+
+# precompiled single-pass parser (see backend/query_parser.py) matching
+# brands against the catalog (see backend/brands.py); cached parses are
+# dropped whenever the brand list is reloaded
+def _match_brand(query: str) -> tuple[str, tuple[int, int], bool] | None:
+    with stage("brand"):
+        return brand_dictionary.match(query)
+
+
+query_parser = QueryParser(
+    _match_brand,
+    category_resolver=_resolve_category,
+    cache_size=QUERY_PARSE_CACHE_SIZE
+)
+brand_dictionary = BrandDictionary(
+    _load_catalog_brands,
+    fallback=KNOWN_BRANDS,
+    on_change=query_parser.clear_cache
+)
+
+
+def understand_query(
     query: str,
     max_price: float | None = None,
     min_price: float | None = None,
     brand: str | None = None,
-    # category: str | None=None, 
-    size: int = 10
-):
+    category: str | None = None
+) -> ParsedQuery:
+    # brand resolution runs inside parse() on a cache miss and is also timed on its own
+    with stage("parse"):
+        parsed = query_parser.parse(query, brand, max_price, min_price, normalize_category(category))
+
+    log_event(
+        logger, "query_understanding",
+        query=query,
+        brand=parsed.brand,
+        brand_inferred=parsed.brand_inferred,
+        category=parsed.category,
+        category_inferred=parsed.category_inferred,
+        min_price=parsed.min_price,
+        max_price=parsed.max_price,
+        cleaned_query=parsed.cleaned_query
+    )
+    return parsed
+
+
+def build_filters(parsed: ParsedQuery) -> list[dict]:
     # -----------------------------
-    # 1. Query Understanding
+    # Strict Filters (BUSINESS LOGIC)
     # -----------------------------
 
-    resolved_brand = brand.lower() if brand else resolve_brand_fuzzy(query)
-    # resolved_category = category.lower() if category else resolve_category_from_query(query)
+    filters = []
+
+    if parsed.min_price:
+        filters.append({"range": {"selling_price": {"gte": parsed.min_price}}})
+
+    if parsed.max_price:
+        filters.append({"range": {"selling_price": {"lte": parsed.max_price}}})
 
-    resolved_max_price = max_price if max_price else extract_max_price(query)
-    resolved_min_price = min_price if min_price else extract_min_price(query)
+    if parsed.brand and not parsed.brand_inferred:
+        filters.append({"term": {"brand_normalized": parsed.brand}})
 
-    cleaned_query = clean_query(
-        query,
-        resolved_brand,
-        # resolved_category,
-        resolved_max_price,
-        resolved_min_price
+    if parsed.category and not parsed.category_inferred:
+        filters.append({"term": {"category_normalized": parsed.category}})
+
+    return filters
+
+
+def build_boosts(parsed: ParsedQuery) -> list[dict]:
+    # soft signals for the lexical side: an inferred brand or category only lifts matching products
+    boosts = []
+    if parsed.brand and parsed.brand_inferred:
+        boosts.append({"term": {"brand_normalized": {"value": parsed.brand, "boost": BRAND_BOOST}}})
+    if parsed.category and parsed.category_inferred:
+        boosts.append({"term": {"category_normalized": {"value": parsed.category, "boost": CATEGORY_BOOST}}})
+    return boosts
+
+
+# -----------------------------
+# KNN SIZING
+# -----------------------------
+
+filter_count_cache = TTLCache(10000, FILTER_COUNT_CACHE_TTL)
+
+
+def _bucket_price(value: float, up: bool) -> float:
+    # steps of a quarter of the leading power of ten: 499 -> 500, 1234 -> 1250
+    if value <= 0:
+        return 0
+    step = 10 ** math.floor(math.log10(value)) / 4
+    return (math.ceil if up else math.floor)(value / step) * step
+
+
+def _count_filters(filters: list[dict]) -> list[dict]:
+    """
+    Filters for the selectivity count, with price bounds widened to buckets.
+    The count only sizes kNN, so an estimate is enough, and free-form
+    prices then share count cache entries.
+    """
+    bucketed = []
+    for f in filters:
+        bounds = f.get("range", {}).get("selling_price")
+        if bounds:
+            f = {"range": {"selling_price": {
+                op: _bucket_price(value, up=(op == "lte")) for op, value in bounds.items()
+            }}}
+        bucketed.append(f)
+    return bucketed
+
+
+def _filter_count_key(index_version: str, filters: list[dict]) -> str:
+    return json.dumps([index_version, filters], sort_keys=True, separators=(",", ":"))
+
+
+def count_matching(filters: list[dict], index_version: str) -> int:
+    """Documents passing `filters` (all documents for []), approximately, cached per index version."""
+    filters = _count_filters(filters)
+    key = _filter_count_key(index_version, filters)
+    count = filter_count_cache.get(key)
+    if count is None:
+        count = es.count(index=INDEX_NAME, query={"bool": {"filter": filters}})["count"]
+        filter_count_cache.set(key, count)
+    return count
+
+
+def resolve_knn_params(
+    size: int,
+    knn_prefilter: bool,
+    filtered_docs: int | None = None,
+    total_docs: int | None = None,
+    recall_target: float = KNN_RECALL_TARGET
+) -> dict:
+    """
+    k / num_candidates for one request.
+
+    k covers `size` with KNN_K_PER_RESULT headroom for the BM25 blend.
+    num_candidates grows with the recall target (x2 at 0.90, x3 at 0.99).
+    Post-filtering throws away neighbours that fail the filters, so k is
+    scaled up by 1 / selectivity. Pre-filtering over a filtered set that
+    fits in num_candidates makes ES run an exact search, so num_candidates
+    is raised to cover it when that stays within the cap.
+    """
+    if not KNN_ADAPTIVE:
+        return {"k": KNN_K, "num_candidates": KNN_NUM_CANDIDATES, "adaptive": False}
+
+    selectivity = 1.0
+    if filtered_docs is not None and total_docs:
+        selectivity = max(filtered_docs / total_docs, 1e-6)
+
+    k = max(KNN_MIN_K, math.ceil(size * KNN_K_PER_RESULT))
+    if not knn_prefilter:
+        k = math.ceil(k / selectivity)
+    k = min(k, KNN_MAX_K)
+
+    recall_target = min(max(recall_target, 0.5), 0.999)
+    num_candidates = math.ceil(k * (1 + math.log10(1 / (1 - recall_target))))
+    if knn_prefilter and filtered_docs is not None and filtered_docs <= KNN_MAX_NUM_CANDIDATES:
+        num_candidates = max(num_candidates, filtered_docs)
+    num_candidates = max(k, min(num_candidates, KNN_MAX_NUM_CANDIDATES))
+
+    return {
+        "k": k,
+        "num_candidates": num_candidates,
+        "adaptive": True,
+        "selectivity": round(selectivity, 6),
+        "filtered_docs": filtered_docs,
+        "recall_target": recall_target
+    }
+
+
+def knn_params_for(size: int, filters: list[dict], knn_prefilter: bool, index_version: str) -> dict:
+    if not KNN_ADAPTIVE or not filters:
+        return resolve_knn_params(size, knn_prefilter)
+    return resolve_knn_params(
+        size,
+        knn_prefilter,
+        filtered_docs=count_matching(filters, index_version),
+        total_docs=count_matching([], index_version)
     )
 
-    print("Query Understanding")
-    print("  Original Query:   ", query)
-    print("  Resolved Brand:   ", resolved_brand)
-    # print("  Resolved Category:", resolved_category)
-    print("  Resolved Min Rs:   ", resolved_min_price)
-    print("  Resolved Max Rs:   ", resolved_max_price)
-    print("  Cleaned Query:    ", cleaned_query)
+
+def resolve_fusion(fusion: str | None, size: int) -> dict:
+    fusion = fusion or FUSION_MODE
+    if fusion not in FUSION_MODES:
+        raise ValueError(f"fusion must be one of {FUSION_MODES}, got {fusion!r}")
+    if fusion == "sum":
+        return {"mode": "sum"}
+    return {"mode": "rrf", "rank_window_size": max(RRF_RANK_WINDOW, size), "rank_constant": RRF_RANK_CONSTANT}
+
+
+def build_rrf_body(
+    parsed: ParsedQuery,
+    query_vector: list[float],
+    size: int,
+    k: int,
+    num_candidates: int,
+    rank_window_size: int = RRF_RANK_WINDOW,
+    rank_constant: int = RRF_RANK_CONSTANT
+) -> dict:
+    """
+    BM25 and kNN as separate retrievers, fused by rank instead of by score.
+    No min_score: RRF scores only encode rank positions. The kNN retriever
+    always carries the filters since there is no outer bool to apply them.
+    """
+    filters = build_filters(parsed)
+
+    knn = {
+        "field": "embedding",
+        "query_vector": query_vector,
+        "k": k,
+        "num_candidates": num_candidates
+    }
+    if filters:
+        knn["filter"] = filters
+
+    return {
+        "size": size,
+        "retriever": {
+            "rrf": {
+                "retrievers": [
+                    {
+                        "standard": {
+                            "query": {
+                                "bool": {
+                                    "filter": filters,
+                                    "must": {
+                                        "multi_match": {
+                                            "query": parsed.cleaned_query,
+                                            "fields": ["title", "product_details"]
+                                        }
+                                    },
+                                    "should": build_boosts(parsed)
+                                }
+                            }
+                        }
+                    },
+                    {"knn": knn}
+                ],
+                "rank_window_size": max(rank_window_size, size),
+                "rank_constant": rank_constant
+            }
+        }
+    }
+
+
+def build_search_body(
+    parsed: ParsedQuery,
+    query_vector: list[float],
+    size: int,
+    knn_prefilter: bool = KNN_PREFILTER,
+    k: int = KNN_K,
+    num_candidates: int = KNN_NUM_CANDIDATES,
+    fusion: dict | None = None
+) -> dict:
+    if fusion and fusion["mode"] == "rrf":
+        return build_rrf_body(
+            parsed, query_vector, size, k, num_candidates,
+            fusion["rank_window_size"], fusion["rank_constant"]
+        )
+
+    filters = build_filters(parsed)
+
+    knn = {
+        "field": "embedding",
+        "query_vector": query_vector,
+        "k": k,
+        "num_candidates": num_candidates,
+        # "boost": 2.0
+    }
+
+    # Pre-filtering: HNSW only collects neighbours that pass the filters.
+    # Without it, ES gathers k neighbours from the whole index and bool.filter
+    # discards the ones that fail afterwards.
+    if knn_prefilter and filters:
+        knn["filter"] = filters
+
+    # -----------------------------
+    # Hybrid Query (BM25 + Vector)
+    # -----------------------------
+
+    query = {
+        "bool": {
+            # Business filters (DO NOT affect score)
+            "filter": filters,
+            "should": [
+                {
+                    "multi_match": {
+                        "query": parsed.cleaned_query,
+                        "fields": ["title", "product_details"]
+                    }
+                },
+                {"knn": knn}
+            ]
+        }
+    }
+
+    # boosts only re-rank documents that already match the text or vector side
+    boosts = build_boosts(parsed)
+    if boosts:
+        query = {"bool": {"filter": filters, "must": {"bool": {"should": query["bool"]["should"]}}, "should": boosts}}
+
+    return {
+        "size": size,
+        "min_score": 2.0,
+        "query": query
+    }
+
+
+def hybrid_search(
+    query: str,
+    max_price: float | None = None,
+    min_price: float | None = None,
+    brand: str | None = None,
+    category: str | None = None,
+    size: int = 10,
+    knn_prefilter: bool | None = None,
+    fusion: str | None = None,
+    source_fields: list[str] | None = None,
+    es_profile: bool = False
+):
+    # es_profile: run with the ES Profile API and return its output under res["profile"];
+    # caches and the embedding batcher are bypassed so the profile covers the real work
+
+    # -----------------------------
+    # 1. Query Understanding
+    # -----------------------------
+
+    parsed = understand_query(query, max_price, min_price, brand, category)
+    knn_prefilter = KNN_PREFILTER if knn_prefilter is None else knn_prefilter
+    fusion = resolve_fusion(fusion, size)
+    if fusion["mode"] == "rrf":
+        knn_prefilter = True  # the kNN retriever is always filtered
+    index_version = current_index_version()
+
+    cache_key = None
+    if RESULT_CACHE_ENABLED and not es_profile:
+        cache_key = result_cache_key(
+            index_version, parsed, size=size, knn_prefilter=knn_prefilter, fusion=fusion["mode"],
+            source_fields=source_fields
+        )
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            return cached
 
     # -----------------------------
     # 2. Embedding
     # -----------------------------
 
-    query_vector = embed_text(cleaned_query)
-    print(f"Vector dimension: {len(query_vector)}")
+    query_vector = get_query_vector(parsed.cleaned_query, inline=es_profile)
 
     # -----------------------------
-    # 3. Strict Filters (BUSINESS LOGIC)
+    # 3. Filters + Hybrid Query
     # -----------------------------
 
-    filters = []
+    knn_params = knn_params_for(size, build_filters(parsed), knn_prefilter, index_version)
+    body = build_search_body(
+        parsed, query_vector, size, knn_prefilter, knn_params["k"], knn_params["num_candidates"], fusion
+    )
+    body["_source"] = source_filter(source_fields)
+    filter_path = SEARCH_FILTER_PATH
+    if es_profile:
+        body["profile"] = True
+        filter_path = SEARCH_FILTER_PATH + ["profile"]
+    with stage("es"):
+        res = es.search(index=INDEX_NAME, body=body, filter_path=filter_path).body
+    record_stage("es_took", res.get("took", 0) / 1000)
+    res["knn"] = knn_params  # resolved values, reported for tuning
+    res["fusion"] = fusion
 
-    if resolved_min_price:
-        filters.append({"range": {"selling_price": {"gte": resolved_min_price}}})
+    if cache_key is not None:
+        result_cache.set(cache_key, res)
 
-    if resolved_max_price:
-        filters.append({"range": {"selling_price": {"lte": resolved_max_price}}})
+    return res
 
-    if resolved_brand:
-        filters.append({"term": {"brand_normalized": resolved_brand}})
 
-    # if resolved_category:
-    #     filters.append({"term": {"category_normalized": resolved_category}})
+# -----------------------------
+# ASYNC HYBRID SEARCH (API)
+# -----------------------------
 
-    # -----------------------------
-    # 4. Hybrid Query (BM25 + Vector)
-    # -----------------------------
+async_es = get_async_client()
 
-    body = {
-        "size": size,
-        "min_score": 2.0,
-        "query": {
-            "bool": {
-                "filter": filters,
-                "should": [
-                    {
-                        "multi_match": {
-                            "query": cleaned_query,
-                            "fields": ["title", "product_details"]
-                        }
-                    },
-                    {
-                        "knn": {
-                            "field": "embedding",
-                            "query_vector": query_vector,
-                            "k": 200,
-                            "num_candidates": 500,
-                            # "boost": 2.0
-                        }
-                    }
-                ]
-                # Business filters (DO NOT affect score)
-                
-                # Semantic reranking
-                
-            }
+# model.encode is CPU-bound: keep it off the event loop and out of Starlette's threadpool
+embedding_executor = ThreadPoolExecutor(
+    max_workers=EMBEDDING_EXECUTOR_THREADS,
+    thread_name_prefix="query-embedding"
+)
+
+
+async def get_query_vector_async(cleaned_query: str) -> list[float]:
+    # includes time queued behind other requests' encodes
+    with stage("embedding"):
+        return await _get_query_vector_async(cleaned_query)
+
+
+async def _get_query_vector_async(cleaned_query: str) -> list[float]:
+    if QUERY_VECTOR_CACHE_ENABLED:
+        vector = query_vector_cache.get(cleaned_query)
+        if vector is not None:
+            return vector
+
+    if EMBEDDING_BATCHING_ENABLED:
+        # the batcher thread is the dedicated executor
+        vector = await asyncio.wrap_future(embedding_batcher.submit(cleaned_query))
+    else:
+        loop = asyncio.get_running_loop()
+        vector = await loop.run_in_executor(embedding_executor, embed_text, cleaned_query)
+
+    if QUERY_VECTOR_CACHE_ENABLED:
+        query_vector_cache.set(cleaned_query, vector)
+    return vector
+
+
+async def count_matching_async(filters: list[dict], index_version: str) -> int:
+    filters = _count_filters(filters)
+    key = _filter_count_key(index_version, filters)
+    count = filter_count_cache.get(key)
+    if count is None:
+        count = (await async_es.count(index=INDEX_NAME, query={"bool": {"filter": filters}}))["count"]
+        filter_count_cache.set(key, count)
+    return count
+
+
+async def knn_params_for_async(size: int, filters: list[dict], knn_prefilter: bool, index_version: str) -> dict:
+    if not KNN_ADAPTIVE or not filters:
+        return resolve_knn_params(size, knn_prefilter)
+    filtered_docs, total_docs = await asyncio.gather(
+        count_matching_async(filters, index_version),
+        count_matching_async([], index_version)
+    )
+    return resolve_knn_params(size, knn_prefilter, filtered_docs=filtered_docs, total_docs=total_docs)
+
+
+async def current_index_version_async() -> str:
+    if _index_version_is_stale():
+        _set_index_version(
+            await async_es.indices.get_settings(index=INDEX_NAME, name="index.uuid")
+        )
+    return _index_version["value"]
+
+
+async def hybrid_search_async(
+    query: str,
+    max_price: float | None = None,
+    min_price: float | None = None,
+    brand: str | None = None,
+    category: str | None = None,
+    size: int = 10,
+    knn_prefilter: bool | None = None,
+    fusion: str | None = None,
+    source_fields: list[str] | None = None
+):
+    """Same as hybrid_search(), without blocking the event loop."""
+    parsed = understand_query(query, max_price, min_price, brand, category)
+    knn_prefilter = KNN_PREFILTER if knn_prefilter is None else knn_prefilter
+    fusion = resolve_fusion(fusion, size)
+    if fusion["mode"] == "rrf":
+        knn_prefilter = True  # the kNN retriever is always filtered
+    index_version = await current_index_version_async()
+
+    cache_key = None
+    if RESULT_CACHE_ENABLED:
+        cache_key = result_cache_key(
+            index_version, parsed, size=size, knn_prefilter=knn_prefilter, fusion=fusion["mode"],
+            source_fields=source_fields
+        )
+        cached = await result_cache.get_async(cache_key)
+        if cached is not None:
+            return cached
+
+    # the selectivity counts go to ES while the query is being embedded
+    query_vector, knn_params = await asyncio.gather(
+        get_query_vector_async(parsed.cleaned_query),
+        knn_params_for_async(size, build_filters(parsed), knn_prefilter, index_version)
+    )
+    body = build_search_body(
+        parsed, query_vector, size, knn_prefilter, knn_params["k"], knn_params["num_candidates"], fusion
+    )
+    body["_source"] = source_filter(source_fields)
+    with stage("es"):
+        res = (await async_es.search(index=INDEX_NAME, body=body, filter_path=SEARCH_FILTER_PATH)).body
+    record_stage("es_took", res.get("took", 0) / 1000)
+    res["knn"] = knn_params
+    res["fusion"] = fusion
+
+    if cache_key is not None:
+        await result_cache.set_async(cache_key, res)
+
+    return res
+
+
+async def get_query_vectors_async(cleaned_queries: list[str]) -> dict[str, list[float]]:
+    """Vectors for many queries: cache hits first, then one embed_texts call for the rest."""
+    vectors = {}
+    missing = []
+    for text in dict.fromkeys(cleaned_queries):
+        vector = query_vector_cache.get(text) if QUERY_VECTOR_CACHE_ENABLED else None
+        if vector is None:
+            missing.append(text)
+        else:
+            vectors[text] = vector
+
+    if missing:
+        loop = asyncio.get_running_loop()
+        with stage("embedding"):
+            matrix = await loop.run_in_executor(embedding_executor, embed_texts, missing)
+        for text, row in zip(missing, matrix):
+            vectors[text] = row.tolist()
+            if QUERY_VECTOR_CACHE_ENABLED:
+                query_vector_cache.set(text, vectors[text])
+    return vectors
+
+
+async def hybrid_search_batch_async(
+    queries: list[dict],
+    knn_prefilter: bool | None = None,
+    fusion: str | None = None,
+    source_fields: list[str] | None = None
+) -> list[dict]:
+    """
+    hybrid_search() for many queries in one round trip.
+
+    Each entry of `queries` holds hybrid_search() keyword arguments (query,
+    max_price, min_price, brand, category, size). All queries are parsed,
+    embedded in one batch and sent in a single msearch. The result list is
+    aligned with `queries`; a query that fails yields {"error": ...} without
+    affecting the others.
+    """
+    if len(queries) > BATCH_MAX_QUERIES:
+        raise ValueError(f"At most {BATCH_MAX_QUERIES} queries per batch, got {len(queries)}")
+
+    knn_prefilter = KNN_PREFILTER if knn_prefilter is None else knn_prefilter
+    index_version = await current_index_version_async()
+    results: list[dict | None] = [None] * len(queries)
+
+    # 1. query understanding + result cache
+    pending = []  # (position, parsed, size, fusion, prefilter, cache_key)
+    for i, q in enumerate(queries):
+        try:
+            size = q.get("size", 10)
+            parsed = understand_query(
+                q["query"], q.get("max_price"), q.get("min_price"), q.get("brand"), q.get("category")
+            )
+            resolved_fusion = resolve_fusion(fusion, size)
+            prefilter = True if resolved_fusion["mode"] == "rrf" else knn_prefilter
+        except Exception as e:
+            results[i] = {"error": str(e)}
+            continue
+
+        cache_key = None
+        if RESULT_CACHE_ENABLED:
+            cache_key = result_cache_key(
+                index_version, parsed, size=size, knn_prefilter=prefilter, fusion=resolved_fusion["mode"],
+                source_fields=source_fields
+            )
+            cached = await result_cache.get_async(cache_key)
+            if cached is not None:
+                results[i] = cached
+                continue
+        pending.append((i, parsed, size, resolved_fusion, prefilter, cache_key))
+
+    if not pending:
+        return results
+
+    # 2. one embedding batch, overlapped with kNN sizing for every query
+    vectors, *knn_params = await asyncio.gather(
+        get_query_vectors_async([parsed.cleaned_query for _, parsed, *_ in pending]),
+        *(knn_params_for_async(size, build_filters(parsed), prefilter, index_version)
+          for _, parsed, size, _, prefilter, _ in pending),
+        return_exceptions=True
+    )
+    if isinstance(vectors, Exception):
+        raise vectors
+
+    # 3. one msearch for everything still missing
+    searches, sent = [], []
+    for (i, parsed, size, resolved_fusion, prefilter, cache_key), params in zip(pending, knn_params):
+        if isinstance(params, Exception):
+            results[i] = {"error": str(params)}
+            continue
+        body = build_search_body(
+            parsed, vectors[parsed.cleaned_query], size, prefilter,
+            params["k"], params["num_candidates"], resolved_fusion
+        )
+        body["_source"] = source_filter(source_fields)
+        searches.extend([{}, body])
+        sent.append((i, params, resolved_fusion, cache_key))
+
+    if not searches:
+        return results
+
+    with stage("es"):
+        responses = (
+            await async_es.msearch(index=INDEX_NAME, searches=searches, filter_path=MSEARCH_FILTER_PATH)
+        ).body["responses"]
+
+    for (i, params, resolved_fusion, cache_key), res in zip(sent, responses):
+        if "error" in res:
+            error = res["error"]
+            results[i] = {"error": error.get("reason", str(error)) if isinstance(error, dict) else str(error)}
+            continue
+        res.pop("status", None)
+        res["knn"] = params
+        res["fusion"] = resolved_fusion
+        if cache_key is not None:
+            await result_cache.set_async(cache_key, res)
+        results[i] = res
+
+    return results
+
+
+# -----------------------------
+# CURSOR PAGINATION (PIT + search_after)
+# -----------------------------
+
+# pit_id -> monotonic expiry, for the open_pits gauge; ES expires abandoned ones after PIT_KEEP_ALIVE
+_open_pits: dict[str, float] = {}
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def _duration_seconds(value: str) -> float:
+    number, unit = re.fullmatch(r"(\d+)(ms|s|m|h|d)", value).groups()
+    return int(number) * _DURATION_UNITS[unit]
+
+
+def _track_pit(pit_id: str):
+    now = time.monotonic()
+    for stale in [p for p, expires in _open_pits.items() if expires < now]:
+        del _open_pits[stale]
+    _open_pits[pit_id] = now + _duration_seconds(PIT_KEEP_ALIVE)
+
+
+class CursorExpiredError(Exception):
+    """The point-in-time behind a valid cursor has expired or been closed."""
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _cursor_signature(payload: str) -> str:
+    return _b64encode(hmac.new(CURSOR_SECRET, payload.encode(), hashlib.sha256).digest()[:16])
+
+
+def encode_cursor(state: dict) -> str:
+    """Opaque `<payload>.<signature>`: base64url JSON state plus a truncated HMAC-SHA256."""
+    payload = _b64encode(json.dumps(state, separators=(",", ":")).encode())
+    return f"{payload}.{_cursor_signature(payload)}"
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _validate_cursor_state(state: dict):
+    # the signature proves we issued it; the limits are checked again anyway
+    params, knn = state["params"], state["knn"]
+    if not isinstance(state["pit_id"], str) or not isinstance(state["search_after"], list):
+        raise ValueError("bad pit_id / search_after")
+    if not isinstance(params["query"], str) or not params["query"]:
+        raise ValueError("bad query")
+    for key in ("max_price", "min_price"):
+        if params[key] is not None and not _is_number(params[key]):
+            raise ValueError(f"bad {key}")
+    for key in ("brand", "category"):
+        if params[key] is not None and not isinstance(params[key], str):
+            raise ValueError(f"bad {key}")
+    if not isinstance(params["knn_prefilter"], bool):
+        raise ValueError("bad knn_prefilter")
+    if not isinstance(params["size"], int) or not 1 <= params["size"] <= PAGE_MAX_SIZE:
+        raise ValueError("bad size")
+    k, num_candidates = knn["k"], knn["num_candidates"]
+    if not isinstance(k, int) or not 1 <= k <= max(KNN_K, KNN_MAX_K):
+        raise ValueError("bad k")
+    if not isinstance(num_candidates, int) or not k <= num_candidates <= max(KNN_NUM_CANDIDATES, KNN_MAX_NUM_CANDIDATES):
+        raise ValueError("bad num_candidates")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """State from encode_cursor(); ValueError for anything not issued by us or out of limits."""
+    try:
+        payload, signature = cursor.split(".")
+        if not hmac.compare_digest(signature.encode(), _cursor_signature(payload).encode()):
+            raise ValueError("bad signature")
+        state = json.loads(_b64decode(payload))
+        _validate_cursor_state(state)
+    except (ValueError, TypeError, KeyError, AttributeError) as e:
+        raise ValueError("Invalid or corrupted cursor") from e
+    return state
+
+
+async def open_pit_async() -> str:
+    pit_id = (await async_es.open_point_in_time(index=INDEX_NAME, keep_alive=PIT_KEEP_ALIVE))["id"]
+    _track_pit(pit_id)
+    return pit_id
+
+
+async def close_pit_async(pit_id: str):
+    _open_pits.pop(pit_id, None)
+    # already expired or closed is fine
+    await async_es.options(ignore_status=404).close_point_in_time(id=pit_id)
+
+
+async def close_cursor_async(cursor: str):
+    await close_pit_async(decode_cursor(cursor)["pit_id"])
+
+
+async def paginated_search_async(
+    query: str | None = None,
+    max_price: float | None = None,
+    min_price: float | None = None,
+    brand: str | None = None,
+    category: str | None = None,
+    size: int = 10,
+    knn_prefilter: bool | None = None,
+    source_fields: list[str] | None = None,
+    cursor: str | None = None
+) -> dict:
+    """
+    One page of hybrid_search() results, ordered by score over a point-in-time.
+
+    Without a cursor a PIT is opened and the first page returned; with one,
+    the query and the resolved kNN sizing are taken from the cursor so every
+    page runs the identical body and continues with search_after. Cost per
+    page stays flat however deep the client goes, and ordering is stable even
+    if the alias moves to a new index version meanwhile. res["next_cursor"] is
+    None once the results are exhausted; the PIT is then closed. A cursor
+    whose PIT has expired raises CursorExpiredError. Always uses score-sum
+    fusion (RRF retrievers cannot be sorted or paged).
+    """
+    if cursor:
+        state = decode_cursor(cursor)
+        params = state["params"]
+        knn_params = state["knn"]
+    else:
+        params = {
+            "query": query, "max_price": max_price, "min_price": min_price, "brand": brand,
+            "category": category, "size": size,
+            "knn_prefilter": KNN_PREFILTER if knn_prefilter is None else knn_prefilter
         }
+        state = {"params": params, "pit_id": None, "search_after": None}
+        knn_params = None
+
+    parsed = understand_query(
+        params["query"], params["max_price"], params["min_price"], params["brand"], params["category"]
+    )
+    size = params["size"]
+
+    if knn_params is None:
+        index_version = await current_index_version_async()
+        query_vector, knn_params = await asyncio.gather(
+            get_query_vector_async(parsed.cleaned_query),
+            knn_params_for_async(size, build_filters(parsed), params["knn_prefilter"], index_version)
+        )
+    else:
+        query_vector = await get_query_vector_async(parsed.cleaned_query)
+
+    pit_id = state["pit_id"] or await open_pit_async()
+    body = build_search_body(
+        parsed, query_vector, size, params["knn_prefilter"], knn_params["k"], knn_params["num_candidates"]
+    )
+    body["_source"] = source_filter(source_fields)
+    body["pit"] = {"id": pit_id, "keep_alive": PIT_KEEP_ALIVE}
+    body["sort"] = PIT_SORT
+    if state["search_after"]:
+        body["search_after"] = state["search_after"]
+
+    try:
+        # no index: the PIT pins it
+        with stage("es"):
+            res = (await async_es.search(body=body, filter_path=PAGINATION_FILTER_PATH)).body
+        record_stage("es_took", res.get("took", 0) / 1000)
+    except NotFoundError as e:
+        _open_pits.pop(pit_id, None)
+        if state["pit_id"]:
+            # keep_alive ran out between pages, or the cursor was released
+            raise CursorExpiredError("cursor expired") from e
+        raise
+    except Exception:
+        await close_pit_async(pit_id)
+        raise
+
+    # ES may hand back a new PIT id; always continue with the latest one
+    new_pit_id = res.pop("pit_id", pit_id)
+    if new_pit_id != pit_id:
+        _open_pits.pop(pit_id, None)
+    _track_pit(new_pit_id)  # keep_alive was just renewed
+
+    hits = res.get("hits", {}).get("hits", [])
+    if len(hits) < size:
+        await close_pit_async(new_pit_id)
+        res["next_cursor"] = None
+    else:
+        res["next_cursor"] = encode_cursor({
+            "params": params,
+            "knn": knn_params,
+            "pit_id": new_pit_id,
+            "search_after": hits[-1]["sort"]
+        })
+
+    res["knn"] = knn_params
+    res["fusion"] = {"mode": "sum"}
+    return res
+
+
+def search_gauges() -> dict:
+    """Queue and cache state for /metrics, read at scrape time."""
+    batcher = embedding_batcher.stats()
+    vectors = query_vector_cache.stats()
+    results = result_cache.stats()
+    parses = query_parser.cache_info()
+    parse_total = parses.hits + parses.misses
+    return {
+        "embedding_queue_depth": ("Queries waiting for the embedding batcher", batcher["queue_depth"]),
+        "embedding_queue_depth_max": ("Deepest embedding queue seen", batcher["max_queue_depth"]),
+        "embedding_batches_total": ("Batches encoded by the batcher", batcher["batches"]),
+        "embedding_batch_size_avg": ("Average batcher batch size", batcher["avg_batch_size"]),
+        "query_vector_cache_hit_rate": ("Query vector cache hit rate", vectors["hit_rate"]),
+        "query_vector_cache_size": ("Query vectors cached", vectors["size"]),
+        "result_cache_hit_rate": ("Result cache hit rate", results["hit_rate"]),
+        "query_parse_cache_hit_rate": ("Parsed query cache hit rate", parses.hits / parse_total if parse_total else 0.0),
+        "open_pits": ("Point-in-time contexts held open for pagination", len(_open_pits))
     }
 
-    return es.search(index=INDEX_NAME, body=body)
+
+async def close_async_search():
+    # open PITs are left to keep_alive: during a rolling restart the next page
+    # of a session may be served by another worker
+    await async_es.close()
+    await result_cache.aclose()
+    embedding_executor.shutdown(wait=False)
+    embedding_batcher.stop()
 
 
 
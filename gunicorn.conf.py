@@ -0,0 +1,53 @@
+# Multi-worker deployment of backend.main:app
+#
+#   gunicorn backend.main:app -c gunicorn.conf.py
+#
+# Two ways to keep N workers from holding N copies of the model:
+#
+# 1. preload (default, torch backend): the model is loaded once in the
+#    master before forking; workers share its weights copy-on-write.
+# 2. remote: run `python -m backend.embedding_server` once per box and
+#    start the workers with EMBEDDING_BACKEND=remote; workers then never
+#    load torch at all.
+#
+# The app itself is always preloaded; PRELOAD_MODEL=false only skips the
+# model load in the master.
+import gc
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+
+preload_app = True
+PRELOAD_MODEL = os.getenv("PRELOAD_MODEL", "true").lower() == "true"
+
+# intra-op threads per worker: split the cores instead of every worker grabbing all of them
+WORKER_TORCH_THREADS = int(os.getenv("WORKER_TORCH_THREADS", "0")) or max(1, (os.cpu_count() or 1) // workers)
+
+
+def when_ready(server):
+    # master, after the app import and before the first fork
+    from indexing.embeddings import get_model, EMBEDDING_BACKEND
+
+    if not PRELOAD_MODEL or EMBEDDING_BACKEND != "torch":
+        # ONNX Runtime sessions own thread pools that do not survive fork; use remote instead
+        return
+
+    # load weights only: no encode here, OpenMP thread pools must not exist before fork
+    get_model()
+    # move everything allocated so far out of the GC's reach, so collections
+    # in the workers don't write to (and un-share) the preloaded pages
+    gc.freeze()
+    server.log.info("Embedding model preloaded for copy-on-write sharing")
+
+
+def post_fork(server, worker):
+    from indexing.embeddings import set_num_threads, EMBEDDING_BACKEND
+
+    if EMBEDDING_BACKEND == "torch":
+        set_num_threads(WORKER_TORCH_THREADS)
+        server.log.info(f"Worker {worker.pid}: torch threads = {WORKER_TORCH_THREADS}")
@@ -1,3 +1,6 @@
+import re
+from rapidfuzz import process, fuzz
+
 CATEGORY_MAP = {
 
     # ======================
@@ -220,18 +223,85 @@ CATEGORY_MAP = {
 }
 
 
+# -----------------------------
+# PRECOMPUTED LOOKUPS
+# -----------------------------
+
+def _build_variant_lookup() -> dict[str, str]:
+    # first canonical wins, same as the original ordered scan (ORDER MATTERS!)
+    lookup = {}
+    for canonical, variants in CATEGORY_MAP.items():
+        lookup.setdefault(canonical, canonical)
+        for v in variants:
+            lookup.setdefault(v.lower(), canonical)
+    return lookup
+
+
+VARIANT_TO_CANONICAL = _build_variant_lookup()
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _build_phrase_lookup() -> dict[str, str]:
+    # every canonical name and variant as space-joined tokens, plus the
+    # concatenated form so "t shirts" (from "t-shirts") finds "tshirts"
+    lookup = {}
+    for text, canonical in VARIANT_TO_CANONICAL.items():
+        tokens = _TOKEN_RE.findall(text)
+        if tokens:
+            lookup.setdefault(" ".join(tokens), canonical)
+            lookup.setdefault("".join(tokens), canonical)
+    return lookup
+
+
+# Query-intent vocabulary: exact phrases, and the single words fuzzy matching may use
+_PHRASE_TO_CANONICAL = _build_phrase_lookup()
+_PHRASE_MAX_WORDS = max(p.count(" ") + 1 for p in _PHRASE_TO_CANONICAL)
+_FUZZY_WORDS = [p for p in _PHRASE_TO_CANONICAL if " " not in p]
+CATEGORY_MIN_FUZZY_LENGTH = 4  # shorter query words ("red", "top") only match exactly
+
+
 def normalize_category(raw_category: str | None) -> str | None:
     if not raw_category:
         return None
 
     raw = raw_category.strip().lower()
 
-    for canonical, variants in CATEGORY_MAP.items():
-        if raw == canonical:
-            return canonical
-        for v in variants:
-            if raw == v.lower():
-                return canonical
-
     # fallback: keep cleaned raw
-    return raw
+    return VARIANT_TO_CANONICAL.get(raw, raw)
+
+
+def resolve_category_from_query(query: str, threshold: int = 85) -> tuple[str, bool] | None:
+    """
+    Category intent of a search query as (canonical, exact), or None.
+
+    Exact: some word n-gram of the query is a canonical name or variant.
+    Longer n-grams win, then the rightmost one ("shirt dress" -> dress).
+    Otherwise single query words are fuzzy-matched (fuzz.ratio, whole
+    words only) against single-word names; the result is only inferred
+    and callers should boost on it rather than filter.
+    """
+    tokens = _TOKEN_RE.findall((query or "").lower())
+    if not tokens:
+        return None
+
+    for n in range(min(_PHRASE_MAX_WORDS, len(tokens)), 0, -1):
+        for i in range(len(tokens) - n, -1, -1):
+            words = tokens[i:i + n]
+            canonical = (
+                _PHRASE_TO_CANONICAL.get(" ".join(words))
+                or _PHRASE_TO_CANONICAL.get("".join(words))
+            )
+            if canonical:
+                return canonical, True
+
+    best = None
+    for position, token in enumerate(tokens):
+        if len(token) < CATEGORY_MIN_FUZZY_LENGTH:
+            continue
+        hit = process.extractOne(token, _FUZZY_WORDS, scorer=fuzz.ratio, score_cutoff=threshold)
+        # best score, then the longer word, then the rightmost
+        if hit and (best is None or (hit[1], len(token), position) > best[0]):
+            best = ((hit[1], len(token), position), _PHRASE_TO_CANONICAL[hit[0]])
+
+    return (best[1], False) if best else None
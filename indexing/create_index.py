@@ -1,31 +1,52 @@
-from elasticsearch import Elasticsearch
+from elasticsearch import NotFoundError
+from indexing.es_client import get_client
 import os
+import re
+import time
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-ELASTIC_USERNAME = "elastic"
-ELASTIC_PASSWORD = os.getenv("ELASTIC_PASSWORD")
+# Read alias queried by backend/search.py; physical indices are `{INDEX_NAME}_{timestamp}`
 INDEX_NAME = os.getenv("INDEX_NAME", "ecommerce_products_v1")
 
+INDEX_KEEP_VERSIONS = int(os.getenv("INDEX_KEEP_VERSIONS", "2"))  # current + rollback targets
+INDEX_REPLICAS = int(os.getenv("INDEX_REPLICAS", "1"))
+INDEX_REFRESH_INTERVAL = os.getenv("INDEX_REFRESH_INTERVAL", "1s")
+FORCEMERGE_SEGMENTS = int(os.getenv("FORCEMERGE_SEGMENTS", "1"))
+
+# HNSW graph over fp32 vectors, or over int8 / int4 / binary (bbq) quantized copies of them
+VECTOR_INDEX_TYPES = ("hnsw", "int8_hnsw", "int4_hnsw", "bbq_hnsw")
+VECTOR_INDEX_TYPE = os.getenv("VECTOR_INDEX_TYPE", "hnsw")
+VECTOR_INDEX_M = int(os.getenv("VECTOR_INDEX_M", "16"))
+VECTOR_INDEX_EF_CONSTRUCTION = int(os.getenv("VECTOR_INDEX_EF_CONSTRUCTION", "100"))
+EMBEDDING_DIMS = 384
+
 # Connect to Elasticsearch
-es = Elasticsearch(
-    "https://localhost:9200",
-    basic_auth=(ELASTIC_USERNAME, ELASTIC_PASSWORD),
-    verify_certs=False  # local self-signed cert
-)
-
-# Test connection
-if es.ping():
-    print("Connected to Elasticsearch")
-else:
-    print("Elasticsearch connection failed")
-
-# DELETE index if exists (IMPORTANT when changing mapping)
-if es.indices.exists(index=INDEX_NAME):
-    es.indices.delete(index=INDEX_NAME)
-    print(f"Deleted existing index `{INDEX_NAME}`")
+es = get_client()
+
+
+def vector_index_options(
+    index_type: str = VECTOR_INDEX_TYPE,
+    m: int = VECTOR_INDEX_M,
+    ef_construction: int = VECTOR_INDEX_EF_CONSTRUCTION
+) -> dict:
+    if index_type not in VECTOR_INDEX_TYPES:
+        raise ValueError(f"VECTOR_INDEX_TYPE must be one of {VECTOR_INDEX_TYPES}, got {index_type!r}")
+    return {"type": index_type, "m": m, "ef_construction": ef_construction}
+
+
+def vector_bytes_per_doc(index_options: dict, dims: int = EMBEDDING_DIMS) -> int:
+    """Rough off-heap bytes per vector: the (quantized) vector plus the HNSW graph links."""
+    vector = {
+        "hnsw": dims * 4,
+        "int8_hnsw": dims + 4,
+        "int4_hnsw": dims // 2 + 4,
+        "bbq_hnsw": dims // 8 + 14
+    }[index_options["type"]]
+    return vector + index_options["m"] * 2 * 4
+
 
 # Final index mapping (PRODUCTION-GRADE)
 mapping = {
@@ -67,17 +88,163 @@ mapping = {
             # Vector Search (MiniLM → 384 dims)
             "embedding": {
                 "type": "dense_vector",
-                "dims": 384,
+                "dims": EMBEDDING_DIMS,
                 "index": True,
-                "similarity": "cosine"
+                "similarity": "cosine",
+                "index_options": vector_index_options()
             }
         }
     }
 }
 
-# Create index
-es.indices.create(index=INDEX_NAME, body=mapping)
-print(f"Index `{INDEX_NAME}` created successfully")
+
+def build_mappings(index_options: dict | None = None) -> dict:
+    """`mapping["mappings"]`, optionally with different vector index options."""
+    if index_options is None:
+        return mapping["mappings"]
+    properties = dict(mapping["mappings"]["properties"])
+    properties["embedding"] = {**properties["embedding"], "index_options": index_options}
+    return {"properties": properties}
+
+
+# Bulk load: no refreshes, no replica writes
+BULK_SETTINGS = {
+    "number_of_replicas": 0,
+    "refresh_interval": "-1"
+}
+
+SERVING_SETTINGS = {
+    "number_of_replicas": INDEX_REPLICAS,
+    "refresh_interval": INDEX_REFRESH_INTERVAL
+}
+
+_VERSION_RE = re.compile(rf"^{re.escape(INDEX_NAME)}_\d{{14}}$")
+
+
+# -----------------------------
+# VERSIONS
+# -----------------------------
+
+def new_version_name() -> str:
+    return f"{INDEX_NAME}_{time.strftime('%Y%m%d%H%M%S')}"
+
+
+def list_versions() -> list[str]:
+    """
+    Versioned indices behind INDEX_NAME, oldest first. Hidden indices
+    (failed builds kept by quarantine_index) are not expanded by the
+    wildcard, so pruning and rollback never pick them.
+    """
+    indices = es.indices.get(index=f"{INDEX_NAME}_*", allow_no_indices=True, expand_wildcards="open")
+    return sorted(name for name in indices if _VERSION_RE.match(name))
+
+
+def alias_targets() -> list[str]:
+    try:
+        return sorted(es.indices.get_alias(name=INDEX_NAME))
+    except NotFoundError:
+        return []
+
+
+def create_versioned_index(name: str | None = None, bulk: bool = True, index_options: dict | None = None) -> str:
+    name = name or new_version_name()
+    settings = BULK_SETTINGS if bulk else SERVING_SETTINGS
+    mappings = build_mappings(index_options)
+    es.indices.create(index=name, settings=settings, mappings=mappings)
+    vector_type = mappings["properties"]["embedding"]["index_options"]["type"]
+    print(f"Index `{name}` created ({'bulk' if bulk else 'serving'} settings, {vector_type} vectors)")
+    return name
+
+
+def finalize_index(name: str):
+    """Restore serving settings after a bulk load and compact segments."""
+    es.indices.put_settings(index=name, settings=SERVING_SETTINGS)
+    es.indices.refresh(index=name)
+
+    if FORCEMERGE_SEGMENTS > 0:
+        print(f"Force-merging `{name}` to {FORCEMERGE_SEGMENTS} segment(s)")
+        es.options(request_timeout=3600).indices.forcemerge(
+            index=name, max_num_segments=FORCEMERGE_SEGMENTS
+        )
+
+    es.options(request_timeout=600).cluster.health(
+        index=name, wait_for_status="yellow", timeout="10m"
+    )
+    print(f"Index `{name}` finalized")
+
+
+def quarantine_index(name: str):
+    """Keep a failed build for inspection: searchable, but hidden from list_versions()."""
+    es.indices.put_settings(index=name, settings={**SERVING_SETTINGS, "hidden": True})
+    es.indices.refresh(index=name)
+    print(f"Index `{name}` hidden; delete it by hand once inspected")
+
+
+def swap_alias(name: str):
+    """Atomically point INDEX_NAME at `name`."""
+    actions = [{"remove": {"index": old, "alias": INDEX_NAME}} for old in alias_targets() if old != name]
+
+    # first run after the delete/recreate era: a concrete index squats on the alias name
+    if not actions and es.indices.exists(index=INDEX_NAME) and not es.indices.exists_alias(name=INDEX_NAME):
+        actions.append({"remove_index": {"index": INDEX_NAME}})
+
+    actions.append({"add": {"index": name, "alias": INDEX_NAME}})
+    es.indices.update_aliases(actions=actions)
+    print(f"Alias `{INDEX_NAME}` -> `{name}`")
+
+
+def prune_versions(keep: int = INDEX_KEEP_VERSIONS):
+    live = set(alias_targets())
+    versions = list_versions()
+
+    for name in versions[:-keep] if keep > 0 else versions:
+        if name in live:
+            continue
+        es.indices.delete(index=name)
+        print(f"Deleted old index `{name}`")
+
+
+def rollback() -> str:
+    """Point the alias back at the newest version older than the live one."""
+    live = alias_targets()
+    versions = list_versions()
+    current = live[-1] if live else None
+
+    older = [v for v in versions if current is None or v < current]
+    if not older:
+        raise RuntimeError(f"No older version of `{INDEX_NAME}` to roll back to")
+
+    swap_alias(older[-1])
+    return older[-1]
+
+
+def main():
+    # Test connection
+    if es.ping():
+        print("Connected to Elasticsearch")
+    else:
+        print("Elasticsearch connection failed")
+        return
+
+    if alias_targets():
+        # never drop the live index: build a new version and swap instead
+        print(f"Alias `{INDEX_NAME}` already exists; run `python -m indexing.reindex` to rebuild")
+        return
+
+    if es.indices.exists(index=INDEX_NAME):
+        # legacy concrete index holding live data: swapping an empty version
+        # in would delete it, so only a full reindex may replace it
+        print(f"`{INDEX_NAME}` is a concrete index with live data; run `python -m indexing.reindex` "
+              f"to build a versioned copy and move the alias over")
+        return
+
+    name = create_versioned_index(bulk=False)
+    swap_alias(name)
+
+
+if __name__ == "__main__":
+    main()
+
 
 
 
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Set to an empty string to disable vector reuse across reindexes
+EMBEDDING_STORE_DIR = os.getenv("EMBEDDING_STORE_DIR", "data/embedding_store")
+
+
+def text_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    Product vectors persisted between index builds.
+
+    Each build writes a generation directory holding a raw float32 matrix
+    (vectors.f32, read back with np.memmap) and a sidecar index.json mapping
+    product_id -> [row, text_hash]. CURRENT names the live generation and is
+    swapped atomically on commit(), so an aborted build never corrupts it.
+    """
+
+    VECTORS_FILE = "vectors.f32"
+    INDEX_FILE = "index.json"
+    CURRENT_FILE = "CURRENT"
+
+    def __init__(self, path: str, model_id: str, dims: int):
+        self.path = path
+        self.model_id = model_id
+        self.dims = dims
+
+        # previous generation (read-only)
+        self._rows = {}
+        self._rows_by_hash = {}
+        self._vectors = None
+
+        # generation being written
+        self._gen_dir = None
+        self._vectors_file = None
+        self._vectors_reader = None
+        self._new_rows = {}
+        self._new_rows_by_hash = {}
+        self._new_count = 0
+
+        self._load()
+
+    # -----------------------------
+    # READ
+    # -----------------------------
+
+    def _load(self):
+        current = os.path.join(self.path, self.CURRENT_FILE)
+        if not os.path.exists(current):
+            return
+
+        with open(current) as f:
+            gen_dir = os.path.join(self.path, f.read().strip())
+
+        with open(os.path.join(gen_dir, self.INDEX_FILE)) as f:
+            meta = json.load(f)
+
+        if meta.get("model") != self.model_id or meta.get("dims") != self.dims:
+            print(f"[EMBEDDING STORE] stored vectors are from `{meta.get('model')}`, ignoring them")
+            return
+
+        if not meta["count"]:
+            return
+
+        self._vectors = np.memmap(
+            os.path.join(gen_dir, self.VECTORS_FILE),
+            dtype=np.float32,
+            mode="r",
+            shape=(meta["count"], self.dims)
+        )
+        self._rows = {pid: (row, h) for pid, (row, h) in meta["rows"].items()}
+        self._rows_by_hash = {h: row for row, h in self._rows.values()}
+
+    def __len__(self):
+        return len(self._rows)
+
+    def lookup(self, product_id: str, h: str) -> np.ndarray | None:
+        """
+        Stored vector for this product if its text is unchanged, or for any
+        product with the same text, in the previous generation or among the
+        vectors already written by this build.
+        """
+        if self._vectors is not None:
+            entry = self._rows.get(product_id)
+            if entry is not None and entry[1] == h:
+                return self._vectors[entry[0]]
+
+        row = self._new_rows_by_hash.get(h)
+        if row is not None:
+            return self._read_new_row(row)
+
+        if self._vectors is not None:
+            row = self._rows_by_hash.get(h)
+            if row is not None:
+                return self._vectors[row]
+
+        return None
+
+    def _read_new_row(self, row: int) -> np.ndarray:
+        self._vectors_file.flush()
+        row_bytes = self.dims * np.dtype(np.float32).itemsize
+        self._vectors_reader.seek(row * row_bytes)
+        return np.frombuffer(self._vectors_reader.read(row_bytes), dtype=np.float32)
+
+    # -----------------------------
+    # WRITE
+    # -----------------------------
+
+    def begin(self):
+        os.makedirs(self.path, exist_ok=True)
+        self._gen_dir = f"gen-{time.strftime('%Y%m%d%H%M%S')}-{os.getpid()}"
+        os.makedirs(os.path.join(self.path, self._gen_dir))
+        self._vectors_file = open(os.path.join(self.path, self._gen_dir, self.VECTORS_FILE), "wb")
+        self._vectors_reader = open(self._vectors_file.name, "rb")
+        self._new_rows = {}
+        self._new_rows_by_hash = {}
+        self._new_count = 0
+
+    def put(self, product_id: str, h: str, vector: np.ndarray):
+        row = self._new_rows_by_hash.get(h)
+        if row is None:
+            row = self._new_count
+            self._vectors_file.write(np.ascontiguousarray(vector, dtype=np.float32).tobytes())
+            self._new_rows_by_hash[h] = row
+            self._new_count += 1
+        self._new_rows[product_id] = (row, h)
+
+    def commit(self):
+        self._vectors_file.close()
+        self._vectors_reader.close()
+
+        gen_path = os.path.join(self.path, self._gen_dir)
+        with open(os.path.join(gen_path, self.INDEX_FILE), "w") as f:
+            json.dump({
+                "model": self.model_id,
+                "dims": self.dims,
+                "count": self._new_count,
+                "rows": self._new_rows
+            }, f)
+
+        current = os.path.join(self.path, self.CURRENT_FILE)
+        with open(current + ".tmp", "w") as f:
+            f.write(self._gen_dir)
+        os.replace(current + ".tmp", current)
+
+        # drop older generations
+        for name in os.listdir(self.path):
+            if name.startswith("gen-") and name != self._gen_dir:
+                shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+
+        print(f"[EMBEDDING STORE] saved {len(self._new_rows)} products ({self._new_count} unique vectors)")
+        self._gen_dir = None
+
+    def abort(self):
+        if self._gen_dir is None:
+            return
+        self._vectors_file.close()
+        self._vectors_reader.close()
+        shutil.rmtree(os.path.join(self.path, self._gen_dir), ignore_errors=True)
+        self._gen_dir = None
@@ -1,6 +1,171 @@
-from sentence_transformers import SentenceTransformer
+import os
+import threading
+import numpy as np
+from typing import TYPE_CHECKING
+
+# torch / sentence_transformers are imported on first use: importing this
+# module (and the API) stays cheap until a vector is actually needed
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+EMBEDDING_DIMS = 384
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))  # 0 = runtime default
+
+# torch (fp32 PyTorch), onnx (fp32 ONNX Runtime), onnx-int8 (dynamically quantized ONNX)
+# or remote (the shared embedding server, see backend/embedding_server.py)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+# ONNX exports shipped in the all-MiniLM-L6-v2 hub repo
+EMBEDDING_ONNX_FILE = os.getenv("EMBEDDING_ONNX_FILE", "onnx/model.onnx")
+EMBEDDING_ONNX_INT8_FILE = os.getenv("EMBEDDING_ONNX_INT8_FILE", "onnx/model_quint8_avx2.onnx")
+EMBEDDING_WARMUP_ROUNDS = int(os.getenv("EMBEDDING_WARMUP_ROUNDS", "3"))
+
+
+# -----------------------------
+# BACKENDS
+# -----------------------------
+
+def _load_torch() -> "SentenceTransformer":
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(EMBEDDING_MODEL_NAME)
+
+
+def _load_onnx(file_name: str) -> "SentenceTransformer":
+    from sentence_transformers import SentenceTransformer
+
+    try:
+        import onnxruntime
+    except ImportError as e:
+        raise RuntimeError("ONNX embedding backends need `pip install sentence-transformers[onnx]`") from e
+
+    model_kwargs = {"file_name": file_name, "provider": "CPUExecutionProvider"}
+    if EMBEDDING_THREADS:
+        session_options = onnxruntime.SessionOptions()
+        session_options.intra_op_num_threads = EMBEDDING_THREADS
+        model_kwargs["session_options"] = session_options
+
+    return SentenceTransformer(EMBEDDING_MODEL_NAME, backend="onnx", model_kwargs=model_kwargs)
+
+
+def _load_remote():
+    from indexing.remote_embeddings import RemoteEncoder
+
+    return RemoteEncoder()
+
+
+BACKENDS = {
+    "torch": _load_torch,
+    "onnx": lambda: _load_onnx(EMBEDDING_ONNX_FILE),
+    "onnx-int8": lambda: _load_onnx(EMBEDDING_ONNX_INT8_FILE),
+    "remote": _load_remote,
+}
+
+
+def load_model(backend: str = EMBEDDING_BACKEND) -> "SentenceTransformer":
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown EMBEDDING_BACKEND `{backend}` (expected one of {', '.join(BACKENDS)})")
+
+    loaded = BACKENDS[backend]()
+
+    # vectors must fit the `embedding` dense_vector mapping
+    dims = loaded.get_sentence_embedding_dimension()
+    if dims != EMBEDDING_DIMS:
+        raise ValueError(f"Backend `{backend}` produces {dims}-dim vectors, index expects {EMBEDDING_DIMS}")
+
+    return loaded
+
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_model() -> "SentenceTransformer":
+    """The process-wide model, loaded on first call (thread-safe)."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                if EMBEDDING_BACKEND != "remote":  # remote workers never import torch
+                    set_num_threads(EMBEDDING_THREADS)
+                _model = load_model()
+    return _model
+
+
+def embedding_model_id() -> str:
+    """
+    Identifies vectors produced by this model/backend pair (see
+    indexing/embedding_store.py). With the remote backend it names the
+    backend the embedding server actually runs.
+    """
+    if EMBEDDING_BACKEND == "remote":
+        return f"{EMBEDDING_MODEL_NAME}:{get_model().backend}"
+    return f"{EMBEDDING_MODEL_NAME}:{EMBEDDING_BACKEND}"
+
+
+def is_model_loaded() -> bool:
+    return _model is not None
+
+
+def __getattr__(name):
+    # `from indexing.embeddings import model` keeps working, lazily
+    if name == "model":
+        return get_model()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def set_num_threads(num_threads: int):
+    # torch intra-op threads used by model.encode (ONNX threads are set per session)
+    if not num_threads:
+        return
+    import torch
+
+    if num_threads != torch.get_num_threads():
+        torch.set_num_threads(num_threads)
+
+
+def embed_texts(
+    texts: list[str],
+    batch_size: int = EMBEDDING_BATCH_SIZE,
+    normalize: bool = False,
+    num_threads: int | None = None
+) -> np.ndarray:
+    """
+    Encode many texts in batches. Returns a C-contiguous float32 matrix of
+    shape (len(texts), EMBEDDING_DIMS); rows are unit length if normalize=True.
+    """
+    if num_threads and EMBEDDING_BACKEND != "remote":
+        set_num_threads(num_threads)
+
+    if not texts:
+        return np.empty((0, EMBEDDING_DIMS), dtype=np.float32)
+
+    vectors = get_model().encode(
+        list(texts),
+        batch_size=batch_size,
+        normalize_embeddings=normalize,
+        convert_to_numpy=True,
+        show_progress_bar=False
+    )
+    return np.ascontiguousarray(vectors, dtype=np.float32)
 
-model = SentenceTransformer("all-MiniLM-L6-v2")
 
 def embed_text(text: str):
-    return model.encode(text).tolist()
+    return embed_texts([text])[0].tolist()
+
+
+# short query, typical query, catalog-length text: warms tokenizer and kernels for each shape
+_WARMUP_TEXTS = [
+    "shoes",
+    "red cotton saree for wedding under 2000",
+    "men slim fit formal shirt full sleeves solid pattern cotton blend regular collar " * 4,
+]
+
+
+def warm_up_model(rounds: int = EMBEDDING_WARMUP_ROUNDS):
+    """Load the model and run a few dummy encodes so the first real query is not the slow one."""
+    get_model()
+    for _ in range(rounds):
+        embed_text(_WARMUP_TEXTS[1])
+        embed_texts(_WARMUP_TEXTS)
@@ -0,0 +1,102 @@
+from elasticsearch import Elasticsearch, AsyncElasticsearch
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import asyncio
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ES_HOSTS = [h.strip() for h in os.getenv("ES_HOSTS", "https://localhost:9200").split(",") if h.strip()]
+ELASTIC_USERNAME = os.getenv("ELASTIC_USERNAME", "elastic")
+ELASTIC_PASSWORD = os.getenv("ELASTIC_PASSWORD")
+ES_VERIFY_CERTS = os.getenv("ES_VERIFY_CERTS", "false").lower() == "true"  # local self-signed cert by default
+ES_CA_CERTS = os.getenv("ES_CA_CERTS") or None
+
+# Transport tuning
+ES_CONNECTIONS_PER_NODE = int(os.getenv("ES_CONNECTIONS_PER_NODE", "25"))  # keep-alive pool size per node
+ES_HTTP_COMPRESS = os.getenv("ES_HTTP_COMPRESS", "false").lower() == "true"  # gzip request/response bodies
+ES_REQUEST_TIMEOUT = float(os.getenv("ES_REQUEST_TIMEOUT", "10"))
+ES_MAX_RETRIES = int(os.getenv("ES_MAX_RETRIES", "3"))
+ES_RETRY_ON_TIMEOUT = os.getenv("ES_RETRY_ON_TIMEOUT", "true").lower() == "true"
+ES_RETRY_ON_STATUS = (429, 502, 503, 504)
+# Retries go out immediately: elastic-transport never sleeps between them.
+# A failing node is only taken out of rotation for factor * 2**(failures - 1)
+# seconds (up to the max) while another node is available; with a single
+# node it is resurrected and retried at once, so this is not a backoff.
+# Callers that must wait (bulk indexing) sleep themselves.
+ES_DEAD_NODE_BACKOFF = float(os.getenv("ES_DEAD_NODE_BACKOFF", "1.0"))
+ES_MAX_DEAD_NODE_BACKOFF = float(os.getenv("ES_MAX_DEAD_NODE_BACKOFF", "30"))
+
+ES_WARMUP_CONNECTIONS = int(os.getenv("ES_WARMUP_CONNECTIONS", "4"))
+
+
+def client_options(**overrides) -> dict:
+    options = {
+        "basic_auth": (ELASTIC_USERNAME, ELASTIC_PASSWORD),
+        "verify_certs": ES_VERIFY_CERTS,
+        "ca_certs": ES_CA_CERTS,
+        "connections_per_node": ES_CONNECTIONS_PER_NODE,
+        "http_compress": ES_HTTP_COMPRESS,
+        "request_timeout": ES_REQUEST_TIMEOUT,
+        "max_retries": ES_MAX_RETRIES,
+        "retry_on_timeout": ES_RETRY_ON_TIMEOUT,
+        "retry_on_status": ES_RETRY_ON_STATUS,
+        "dead_node_backoff_factor": ES_DEAD_NODE_BACKOFF,
+        "max_dead_node_backoff": ES_MAX_DEAD_NODE_BACKOFF,
+    }
+    if not ES_VERIFY_CERTS:
+        options["ssl_show_warn"] = False
+    options.update(overrides)
+    return options
+
+
+# -----------------------------
+# FACTORIES
+# -----------------------------
+
+def create_client(**overrides) -> Elasticsearch:
+    """New sync client with the shared transport settings; `overrides` win."""
+    return Elasticsearch(ES_HOSTS, **client_options(**overrides))
+
+
+def create_async_client(**overrides) -> AsyncElasticsearch:
+    return AsyncElasticsearch(ES_HOSTS, **client_options(**overrides))
+
+
+@lru_cache(maxsize=1)
+def get_client() -> Elasticsearch:
+    """The process-wide sync client (one connection pool per node, thread-safe)."""
+    return create_client()
+
+
+@lru_cache(maxsize=1)
+def get_async_client() -> AsyncElasticsearch:
+    """The process-wide async client; use it from a single event loop."""
+    return create_async_client()
+
+
+# -----------------------------
+# WARM-UP
+# -----------------------------
+
+def warm_up(client: Elasticsearch, connections: int = ES_WARMUP_CONNECTIONS) -> int:
+    """
+    Open `connections` pooled connections per call (TLS handshake included)
+    by issuing concurrent lightweight requests. Returns how many succeeded.
+    """
+    with ThreadPoolExecutor(max_workers=connections) as pool:
+        results = list(pool.map(lambda _: _ping(client), range(connections)))
+    return sum(results)
+
+
+async def warm_up_async(client: AsyncElasticsearch, connections: int = ES_WARMUP_CONNECTIONS) -> int:
+    results = await asyncio.gather(*(client.ping() for _ in range(connections)), return_exceptions=True)
+    return sum(1 for r in results if r is True)
+
+
+def _ping(client: Elasticsearch) -> bool:
+    try:
+        return client.ping()
+    except Exception:
+        return False
@@ -1,31 +1,54 @@
-from elasticsearch import Elasticsearch
+from elasticsearch import helpers, TransportError
+from indexing.es_client import create_client
 from indexing.db import get_pg_connection
 from indexing.category_normalizer import normalize_category
-from indexing.embeddings import embed_text
+from indexing.embeddings import embed_texts, embedding_model_id, EMBEDDING_DIMS
+from indexing.embedding_store import EmbeddingStore, EMBEDDING_STORE_DIR, text_hash
 from indexing.preprocess import preprocess
 import math
+import numpy as np
 import os
+import threading
+import time
+from itertools import islice
 from dotenv import load_dotenv
 
 load_dotenv()
 
-ELASTIC_USERNAME = "elastic"
-ELASTIC_PASSWORD = os.getenv("ELASTIC_PASSWORD")
 TABLE_NAME=os.getenv('TABLE_NAME')
 INDEX_NAME = os.environ['INDEX_NAME']
 
+# -----------------------------
+# BULK TUNING
+# -----------------------------
 
-es = Elasticsearch(
-    "https://localhost:9200",
-    basic_auth=(ELASTIC_USERNAME, ELASTIC_PASSWORD),
-    verify_certs=False  # local self-signed cert
-)
+BULK_HELPER = os.getenv("BULK_HELPER", "parallel")  # "parallel" or "streaming"
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "500"))
+BULK_MAX_CHUNK_BYTES = int(os.getenv("BULK_MAX_CHUNK_BYTES", str(20 * 1024 * 1024)))
+BULK_THREAD_COUNT = int(os.getenv("BULK_THREAD_COUNT", "4"))
+BULK_MAX_RETRIES = int(os.getenv("BULK_MAX_RETRIES", "3"))
+BULK_INITIAL_BACKOFF = float(os.getenv("BULK_INITIAL_BACKOFF", "2"))
+BULK_REQUEST_TIMEOUT = float(os.getenv("BULK_REQUEST_TIMEOUT", "120"))
+
+# Rows embedded together in one embed_texts() call
+EMBED_BATCH_ROWS = int(os.getenv("EMBED_BATCH_ROWS", "256"))
 
+# Rows fetched per round trip by the server-side cursor
+PG_ITERSIZE = int(os.getenv("PG_ITERSIZE", "2000"))
 
-conn = get_pg_connection()
-cur = conn.cursor()
+# Rejections / overloaded nodes are worth another attempt, mapping errors are not
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
 
-cur.execute(f"""
+
+# own client: bulk bodies are large and compress well, and the pool must cover the bulk threads
+es = create_client(
+    http_compress=True,
+    request_timeout=BULK_REQUEST_TIMEOUT,
+    connections_per_node=max(BULK_THREAD_COUNT * 2, 10)
+)
+
+
+SELECT_SQL = f"""
     SELECT
         product_id,
         title,
@@ -41,9 +64,7 @@ cur.execute(f"""
         image_url,
         product_url
     FROM {TABLE_NAME}
-""")
-
-rows = cur.fetchall()
+"""
 
 
 def safe(v):
@@ -54,18 +75,39 @@ def safe(v):
     return v
 
 
+# -----------------------------
+# ROW STREAMING
+# -----------------------------
 
-for row in rows:
+def stream_rows(conn):
+    """
+    Iterate the table through a named (server-side) cursor so only
+    PG_ITERSIZE rows are held client-side at a time.
+    """
+    with conn.cursor(name="index_products_stream") as cur:
+        cur.itersize = PG_ITERSIZE
+        cur.execute(SELECT_SQL)
+        yield from cur
+
+
+# -----------------------------
+# DOCUMENT BUILDING
+# -----------------------------
+
+def build_document(row) -> tuple[dict, str]:
+    """Build the ES document (without its vector) and the text to embed."""
     (
         product_id, title, product_details, brand, category, colour,
         size, competitor, selling_price, mrp, star_rating,
         image_url, product_url
     ) = row
 
+    category_normalized = normalize_category(category)
+
     # CLEAN embedding text (NO BRAND — brand is a FILTER, not semantic)
     embedding_text = preprocess(
         f"{safe(title)} {safe(product_details)} "
-        f"Category {safe(normalize_category(category))}. "
+        f"Category {safe(category_normalized)}. "
         f"Colour {safe(colour)}"
     )
 
@@ -82,7 +124,7 @@ for row in rows:
 
         # Normalized fields (FILTERS)
         "brand_normalized": safe(brand.lower()) if brand else None,
-        "category_normalized": safe(normalize_category(category)),
+        "category_normalized": safe(category_normalized),
         "colour_normalized": safe(colour.lower()) if colour else None,
 
         "size": safe(size),
@@ -94,13 +136,286 @@ for row in rows:
 
         "image_url": safe(image_url),
         "product_url": safe(product_url),
-
-        "embedding": embed_text(embedding_text)
     }
+    return doc, embedding_text
+
+
+def batched(iterable, n: int):
+    it = iter(iterable)
+    while batch := list(islice(it, n)):
+        yield batch
+
+
+def embed_batch(product_ids, texts, store: EmbeddingStore | None, stats: dict) -> np.ndarray:
+    """
+    Vectors for one batch. Unchanged texts and texts already encoded earlier
+    in this build are served from the store; duplicate texts inside the batch
+    are encoded only once.
+    """
+    hashes = [text_hash(t) for t in texts]
+    vectors = np.empty((len(texts), EMBEDDING_DIMS), dtype=np.float32)
+    missing = {}  # text hash -> positions in batch
+
+    for i, (product_id, h) in enumerate(zip(product_ids, hashes)):
+        stored = store.lookup(product_id, h) if store else None
+        if stored is not None:
+            vectors[i] = stored
+        else:
+            missing.setdefault(h, []).append(i)
+
+    if missing:
+        positions = list(missing.values())
+        encoded = embed_texts([texts[p[0]] for p in positions])
+        for p, vector in zip(positions, encoded):
+            vectors[p] = vector
+
+    stats["embedded"] += len(missing)
+    stats["reused"] += len(texts) - sum(len(p) for p in missing.values())
+
+    if store:
+        for product_id, h, vector in zip(product_ids, hashes, vectors):
+            store.put(product_id, h, vector)
+
+    return vectors
+
+
+def generate_actions(rows, index_name: str = INDEX_NAME, store: EmbeddingStore | None = None, stats: dict | None = None):
+    stats = stats if stats is not None else {"embedded": 0, "reused": 0}
+
+    for batch in batched(rows, EMBED_BATCH_ROWS):
+        docs, texts = zip(*(build_document(row) for row in batch))
+        vectors = embed_batch([d["product_id"] for d in docs], texts, store, stats)
+
+        for doc, vector in zip(docs, vectors):
+            doc["embedding"] = vector.tolist()
+            yield {
+                "_op_type": "index",
+                "_index": index_name,
+                "_id": doc["product_id"],
+                "_source": doc,
+            }
+
+
+# -----------------------------
+# BULK SENDING
+# -----------------------------
+
+def _bulk_results(actions):
+    """
+    Run the configured bulk helper and yield (ok, info, action) per document.
+
+    Results are matched back to their action by _id because streaming_bulk
+    yields 429-retried items out of submission order.
+
+    raise_on_exception only covers per-item API errors: a ConnectionTimeout
+    or ConnectionError still escapes the helper. The helper is stopped
+    from pulling more actions, every action still in flight is reported as
+    a retryable failure and a fresh helper resumes on the remaining actions.
+    After BULK_MAX_RETRIES consecutive transport errors without progress
+    the error is raised.
+    """
+    actions = iter(actions)
+    in_flight = {}
+    consecutive_errors = 0
+
+    while True:
+        try:
+            for ok, info, action in _run_bulk_helper(actions, in_flight):
+                consecutive_errors = 0
+                yield ok, info, action
+            return
+        except TransportError as e:
+            consecutive_errors += 1
+            if consecutive_errors > BULK_MAX_RETRIES:
+                raise
+            print(f"[BULK] transport error, {len(in_flight)} documents in flight will be retried: {e}")
+            for _id, action in in_flight.items():
+                # no HTTP status: _is_retryable treats it as retryable
+                yield False, {"_id": _id, "status": None, "error": repr(e)}, action
+            in_flight.clear()
+            time.sleep(BULK_INITIAL_BACKOFF * (2 ** (consecutive_errors - 1)))
+
+
+class _StopOnTransportError:
+    """
+    Client handed to the bulk helpers. A transport error on any chunk sets
+    `failed` from the thread that sent it, before the helper unwinds:
+    parallel_bulk's pool.join() would otherwise drain the whole action
+    stream (embedding and sending it) before the error reaches us.
+    """
+
+    __slots__ = ("_client", "_failed")
+
+    def __init__(self, client, failed: threading.Event):
+        object.__setattr__(self, "_client", client)
+        object.__setattr__(self, "_failed", failed)
+
+    def bulk(self, *args, **kwargs):
+        try:
+            return self._client.bulk(*args, **kwargs)
+        except TransportError:
+            self._failed.set()
+            raise
+
+    def options(self, **kwargs):
+        return _StopOnTransportError(self._client.options(**kwargs), self._failed)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._client, name, value)
+
+
+def _run_bulk_helper(actions, in_flight: dict):
+    failed = threading.Event()
+
+    def track(stream):
+        # checked before pulling, so what the helper never took stays in `actions`
+        while not failed.is_set():
+            action = next(stream, None)
+            if action is None:
+                return
+            in_flight[action["_id"]] = action
+            yield action
+
+    client = _StopOnTransportError(es.options(request_timeout=BULK_REQUEST_TIMEOUT), failed)
+    common = dict(
+        chunk_size=BULK_CHUNK_SIZE,
+        max_chunk_bytes=BULK_MAX_CHUNK_BYTES,
+        raise_on_error=False,
+        raise_on_exception=False,
+    )
+
+    if BULK_HELPER == "streaming":
+        results = helpers.streaming_bulk(
+            client,
+            track(actions),
+            max_retries=BULK_MAX_RETRIES,
+            initial_backoff=BULK_INITIAL_BACKOFF,
+            **common
+        )
+    else:
+        results = helpers.parallel_bulk(
+            client,
+            track(actions),
+            thread_count=BULK_THREAD_COUNT,
+            queue_size=BULK_THREAD_COUNT,
+            **common
+        )
+
+    for ok, item in results:
+        _, info = next(iter(item.items()))
+        yield ok, info, in_flight.pop(info.get("_id"), None)
+
+
+def _is_retryable(info: dict) -> bool:
+    status = info.get("status")
+    # transport errors (timeouts, connection resets) carry no HTTP status
+    return not isinstance(status, int) or status in RETRYABLE_STATUSES
+
+
+def bulk_index(actions) -> tuple[int, list[dict]]:
+    """
+    Send actions through the bulk helpers, retrying retryable per-document
+    failures with exponential backoff. Returns (indexed_count, failures).
+    """
+    indexed = 0
+    failures = []
+    retry = []
+
+    for ok, info, action in _bulk_results(actions):
+        if ok:
+            indexed += 1
+            if indexed % 10000 == 0:
+                print(f"[BULK] indexed {indexed} documents")
+        elif action is not None and _is_retryable(info):
+            retry.append(action)
+        else:
+            failures.append(info)
+
+    for attempt in range(1, BULK_MAX_RETRIES + 1):
+        if not retry:
+            break
+
+        backoff = BULK_INITIAL_BACKOFF * (2 ** (attempt - 1))
+        print(f"[BULK] retrying {len(retry)} documents in {backoff:.0f}s (attempt {attempt}/{BULK_MAX_RETRIES})")
+        time.sleep(backoff)
+
+        pending, retry = retry, []
+        for ok, info, action in _bulk_results(pending):
+            if ok:
+                indexed += 1
+            elif action is not None and _is_retryable(info) and attempt < BULK_MAX_RETRIES:
+                retry.append(action)
+            else:
+                failures.append(info)
+
+    return indexed, failures
+
+
+def report_failures(failures: list[dict], limit: int = 20):
+    if not failures:
+        return
+
+    print(f"[BULK] {len(failures)} documents failed to index")
+    for info in failures[:limit]:
+        error = info.get("error")
+        if isinstance(error, dict):
+            error = f"{error.get('type')}: {error.get('reason')}"
+        print(f"  - {info.get('_id')} status={info.get('status')} error={error}")
+
+    if len(failures) > limit:
+        print(f"  ... and {len(failures) - limit} more")
+
+
+# -----------------------------
+# MAIN
+# -----------------------------
+
+def main(index_name: str = INDEX_NAME):
+    conn = get_pg_connection()
+
+    store = None
+    if EMBEDDING_STORE_DIR:
+        store = EmbeddingStore(EMBEDDING_STORE_DIR, embedding_model_id(), EMBEDDING_DIMS)
+        print(f"[EMBEDDING STORE] {len(store)} stored vectors available for reuse")
+        store.begin()
+
+    try:
+        # rows -> documents + vectors -> bulk actions, all lazily
+        stats = {"embedded": 0, "reused": 0}
+        actions = generate_actions(stream_rows(conn), index_name, store, stats)
+
+        start = time.perf_counter()
+        indexed, failures = bulk_index(actions)
+        elapsed = time.perf_counter() - start
+
+        if store:
+            store.commit()
+
+        report_failures(failures)
+        print(f"Embedded {stats['embedded']} texts, reused {stats['reused']} stored vectors")
+        print(f"Indexed {indexed} documents into `{index_name}` in {elapsed:.1f}s")
+
+        if failures:
+            print("Indexing completed with errors")
+        else:
+            print("Indexing completed successfully")
+
+        return indexed, failures
+
+    except BaseException:
+        if store:
+            store.abort()
+        raise
+
+    finally:
+        conn.close()
 
-    es.index(index=INDEX_NAME, id=product_id, document=doc)
 
-print("Indexing completed successfully")
+if __name__ == "__main__":
+    main()
 
 
 
@@ -0,0 +1,70 @@
+import argparse
+import os
+from dotenv import load_dotenv
+from indexing import create_index
+from indexing import index_products
+
+load_dotenv()
+
+# Abort the alias swap if more documents than this failed to index
+REINDEX_MAX_FAILURES = int(os.getenv("REINDEX_MAX_FAILURES", "0"))
+# Keep an aborted build (hidden) for inspection instead of deleting it
+REINDEX_KEEP_FAILED = os.getenv("REINDEX_KEEP_FAILED", "false").lower() == "true"
+
+
+# -----------------------------
+# ZERO-DOWNTIME REINDEX
+# -----------------------------
+
+def reindex():
+    """
+    Build a new versioned index next to the live one, load it with bulk
+    settings, restore serving settings, force-merge, then swap the read
+    alias. Search keeps hitting the old version until the swap.
+    """
+    name = create_index.create_versioned_index(bulk=True)
+
+    try:
+        indexed, failures = index_products.main(index_name=name)
+    except BaseException:
+        print(f"Reindex failed, deleting partial index `{name}`")
+        create_index.es.indices.delete(index=name, ignore_unavailable=True)
+        raise
+
+    if len(failures) > REINDEX_MAX_FAILURES:
+        print(f"{len(failures)} documents failed (limit {REINDEX_MAX_FAILURES}); "
+              f"keeping `{create_index.INDEX_NAME}` on its current version")
+        # a partial build must never become a prune survivor or a rollback target
+        if REINDEX_KEEP_FAILED:
+            create_index.quarantine_index(name)
+        else:
+            print(f"Deleting partial index `{name}`")
+            create_index.es.indices.delete(index=name, ignore_unavailable=True)
+        return None
+
+    create_index.finalize_index(name)
+    create_index.swap_alias(name)
+    create_index.prune_versions()
+    print(f"Reindex completed: {indexed} documents live in `{name}`")
+    return name
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the product index behind its read alias")
+    parser.add_argument("--rollback", action="store_true", help="point the alias back at the previous version")
+    parser.add_argument("--list", action="store_true", help="list index versions")
+    args = parser.parse_args()
+
+    if args.list:
+        live = set(create_index.alias_targets())
+        for name in create_index.list_versions():
+            print(f"{'*' if name in live else ' '} {name}")
+    elif args.rollback:
+        name = create_index.rollback()
+        print(f"Rolled back `{create_index.INDEX_NAME}` to `{name}`")
+    else:
+        reindex()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import json
+import os
+import socket
+import struct
+import threading
+import numpy as np
+
+EMBEDDING_SOCKET = os.getenv("EMBEDDING_SOCKET", "/tmp/embedding.sock")
+EMBEDDING_REMOTE_TIMEOUT = float(os.getenv("EMBEDDING_REMOTE_TIMEOUT", "10"))  # seconds
+
+# -----------------------------
+# WIRE FORMAT
+# -----------------------------
+# Frames are a 4-byte big-endian length followed by the payload.
+# Requests are JSON: {"op": "info"} or {"op": "encode", "texts": [...]}.
+# Responses start with one kind byte:
+#   b"V" + rows (uint32) + dims (uint32) + float32 matrix, row-major
+#   b"J" + JSON
+#   b"E" + utf-8 error message
+
+FRAME_HEADER = struct.Struct(">I")
+_SHAPE = struct.Struct(">II")
+
+
+def send_frame(sock: socket.socket, payload: bytes):
+    sock.sendall(FRAME_HEADER.pack(len(payload)) + payload)
+
+
+def recv_exact(sock: socket.socket, n: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("embedding server closed the connection")
+        buf.extend(chunk)
+    return bytes(buf)
+
+
+def recv_frame(sock: socket.socket) -> bytes:
+    (length,) = FRAME_HEADER.unpack(recv_exact(sock, FRAME_HEADER.size))
+    return recv_exact(sock, length)
+
+
+def encode_vectors(matrix: np.ndarray) -> bytes:
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    return b"V" + _SHAPE.pack(*matrix.shape) + matrix.tobytes()
+
+
+def decode_response(payload: bytes):
+    kind, body = payload[:1], payload[1:]
+    if kind == b"V":
+        rows, dims = _SHAPE.unpack(body[:_SHAPE.size])
+        return np.frombuffer(body[_SHAPE.size:], dtype=np.float32).reshape(rows, dims).copy()  # writable
+    if kind == b"J":
+        return json.loads(body)
+    raise RuntimeError(f"embedding server error: {body.decode(errors='replace')}")
+
+
+# -----------------------------
+# CLIENT
+# -----------------------------
+
+class RemoteEncoder:
+    """
+    Stand-in for a SentenceTransformer that forwards encode() to the local
+    embedding server (backend/embedding_server.py) over a Unix socket. One
+    persistent connection per thread; a broken connection is reopened once.
+    Vectors come back unnormalized and are normalized here when asked.
+    """
+
+    def __init__(self, path: str = EMBEDDING_SOCKET, timeout: float = EMBEDDING_REMOTE_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._info = self._request({"op": "info"})
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self._info["dims"]
+
+    @property
+    def backend(self) -> str:
+        # the local backend the server runs (torch, onnx, onnx-int8)
+        return self._info["backend"]
+
+    def encode(self, sentences, normalize_embeddings: bool = False, **_):
+        # batch_size / convert_to_numpy / show_progress_bar: batching is the server's job
+        if not sentences:
+            return np.empty((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+
+        vectors = self._request({"op": "encode", "texts": list(sentences)})
+        if normalize_embeddings:
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.maximum(norms, 1e-12)
+        return vectors
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.path)
+        self._local.sock = sock
+        return sock
+
+    def _request(self, message: dict):
+        payload = json.dumps(message).encode()
+        for attempt in range(2):
+            sock = getattr(self._local, "sock", None) or self._connect()
+            try:
+                send_frame(sock, payload)
+                return decode_response(recv_frame(sock))
+            except (ConnectionError, OSError):
+                sock.close()
+                self._local.sock = None
+                if attempt:
+                    raise
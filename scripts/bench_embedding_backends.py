@@ -0,0 +1,119 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import time
+import numpy as np
+from indexing.embeddings import load_model, BACKENDS
+
+
+SAMPLE_QUERIES = [
+    "campus shoes under 2000",
+    "nike running shoes for men",
+    "red cotton saree for wedding",
+    "black leather wallet",
+    "women kurta set above 1500",
+    "sports shoes",
+    "denim jacket for boys",
+    "gold plated earrings",
+    "white sneakers under 3000",
+    "floral printed maxi dress",
+    "mens formal shirt slim fit",
+    "waterproof backpack for laptop",
+]
+
+
+# ----------------------------
+# Sample texts
+# ----------------------------
+def load_texts(from_db: bool, limit: int) -> list[str]:
+    if not from_db:
+        return (SAMPLE_QUERIES * (limit // len(SAMPLE_QUERIES) + 1))[:limit]
+
+    from indexing.db import get_pg_connection
+    from indexing.preprocess import preprocess
+
+    conn = get_pg_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT title, product_details FROM {os.environ['TABLE_NAME']} LIMIT %s", (limit,))
+            return [preprocess(f"{title} {details}") for title, details in cur.fetchall()]
+    finally:
+        conn.close()
+
+
+# ----------------------------
+# Measurements
+# ----------------------------
+def encode(model, texts, batch_size):
+    return model.encode(
+        texts,
+        batch_size=batch_size,
+        normalize_embeddings=True,
+        convert_to_numpy=True,
+        show_progress_bar=False
+    ).astype(np.float32)
+
+
+def single_latency_ms(model, texts, runs: int) -> tuple[float, float]:
+    timings = []
+    for i in range(runs):
+        start = time.perf_counter()
+        encode(model, [texts[i % len(texts)]], 1)
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.percentile(timings, 50)), float(np.percentile(timings, 99))
+
+
+def throughput(model, texts, batch_size: int) -> tuple[np.ndarray, float]:
+    start = time.perf_counter()
+    vectors = encode(model, texts, batch_size)
+    return vectors, len(texts) / (time.perf_counter() - start)
+
+
+# ----------------------------
+# Main
+# ----------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Embedding backend parity + throughput")
+    # remote needs a running embedding server: opt in explicitly
+    parser.add_argument("--backends", nargs="+", default=[b for b in BACKENDS if b != "remote"], choices=list(BACKENDS))
+    parser.add_argument("--from-db", action="store_true", help="use product texts from Postgres")
+    parser.add_argument("--limit", type=int, default=1000, help="number of texts")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--single-runs", type=int, default=200)
+    args = parser.parse_args()
+
+    texts = load_texts(args.from_db, args.limit)
+    print(f"{len(texts)} texts, batch size {args.batch_size}")
+
+    reference = None
+    rows = []
+
+    # torch first so every other backend is compared against it
+    backends = sorted(args.backends, key=lambda b: b != "torch")
+    for backend in backends:
+        start = time.perf_counter()
+        model = load_model(backend)
+        load_s = time.perf_counter() - start
+
+        encode(model, texts[:8], 8)  # warm-up
+        p50, p99 = single_latency_ms(model, texts, args.single_runs)
+        vectors, per_sec = throughput(model, texts, args.batch_size)
+
+        if reference is None:
+            reference = vectors
+        cosine = np.sum(vectors * reference, axis=1)  # rows are unit length
+
+        rows.append((backend, load_s, p50, p99, per_sec, cosine.mean(), cosine.min()))
+        del model
+
+    print()
+    print(f"{'backend':<10} {'load s':>7} {'p50 ms':>8} {'p99 ms':>8} {'texts/s':>9} {'cos mean':>9} {'cos min':>8}")
+    for backend, load_s, p50, p99, per_sec, cos_mean, cos_min in rows:
+        print(f"{backend:<10} {load_s:>7.1f} {p50:>8.2f} {p99:>8.2f} {per_sec:>9.0f} {cos_mean:>9.5f} {cos_min:>8.5f}")
+    print(f"\ncosine agreement is measured against `{backends[0]}`")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import time
+import numpy as np
+from backend.search import (
+    es, INDEX_NAME, RRF_RANK_CONSTANT, understand_query, get_query_vector, build_search_body
+)
+
+
+SAMPLE_QUERIES = [
+    "campus shoes under 2000",
+    "nike running shoes for men",
+    "red cotton saree for wedding",
+    "black leather wallet",
+    "women kurta set above 1500",
+    "denim jacket for boys",
+    "gold plated earrings",
+    "waterproof backpack for laptop",
+]
+
+
+# ----------------------------
+# Measurements
+# ----------------------------
+def timed_search(body, runs: int):
+    wall, took = [], []
+    res = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        res = es.search(index=INDEX_NAME, body=body, request_cache=False)
+        wall.append((time.perf_counter() - start) * 1000)
+        took.append(res["took"])
+    return res, float(np.median(wall)), float(np.median(took))
+
+
+def hit_ids(res) -> list[str]:
+    return [hit["_id"] for hit in res["hits"]["hits"]]
+
+
+# ----------------------------
+# Main
+# ----------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Score-sum vs RRF hybrid fusion: latency and overlap")
+    parser.add_argument("--size", type=int, default=10)
+    parser.add_argument("--runs", type=int, default=5, help="timed runs per query (median reported)")
+    parser.add_argument("--sum-k", type=int, default=200, help="k / num_candidates of the current body")
+    parser.add_argument("--sum-candidates", type=int, default=500)
+    parser.add_argument("--windows", type=int, nargs="+", default=[20, 50, 100], help="RRF rank windows to try")
+    parser.add_argument("queries", nargs="*", default=SAMPLE_QUERIES)
+    args = parser.parse_args()
+
+    variants = [("sum", args.sum_k, args.sum_candidates, None)]
+    for window in args.windows:
+        fusion = {"mode": "rrf", "rank_window_size": window, "rank_constant": RRF_RANK_CONSTANT}
+        variants.append((f"rrf@{window}", window, window * 2, fusion))
+
+    print(f"{'query':<30} {'variant':<9} {'wall ms':>8} {'took':>5} {'hits':>5} {'overlap':>8}")
+
+    totals = {name: [] for name, *_ in variants}
+    for query in args.queries:
+        parsed = understand_query(query)
+        vector = get_query_vector(parsed.cleaned_query)
+
+        baseline = None
+        for name, k, num_candidates, fusion in variants:
+            body = build_search_body(parsed, vector, args.size, True, k, num_candidates, fusion)
+            res, wall_ms, took = timed_search(body, args.runs)
+
+            ids = hit_ids(res)
+            if baseline is None:
+                baseline = set(ids)
+            # share of the current (score-sum) top results that the variant also returns
+            overlap = len(baseline.intersection(ids)) / len(baseline) if baseline else 1.0
+            totals[name].append((wall_ms, took, overlap))
+
+            print(f"{query[:30]:<30} {name:<9} {wall_ms:>8.1f} {took:>5.0f} {len(ids):>5} {overlap:>8.2f}")
+
+    print()
+    for name, rows in totals.items():
+        wall_ms, took, overlap = np.mean(rows, axis=0)
+        print(f"{name:<9} mean wall {wall_ms:.1f} ms, took {took:.1f} ms, overlap@{args.size} with sum {overlap:.2f}")
+
+
+if __name__ == "__main__":
+    main()
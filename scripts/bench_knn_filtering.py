@@ -0,0 +1,115 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import time
+import numpy as np
+from backend.search import (
+    es, INDEX_NAME, understand_query, get_query_vector, build_filters, build_search_body
+)
+
+
+# Selective queries are where post-filtering hurts most
+SAMPLE_QUERIES = [
+    "nike shoes under 1500",
+    "campus shoes under 2000",
+    "puma tshirt for men under 700",
+    "red saree above 5000",
+    "adidas track pants under 1000",
+    "black leather wallet under 500",
+    "gold earrings above 2000",
+    "women kurta under 600",
+]
+
+
+# ----------------------------
+# Query bodies
+# ----------------------------
+def knn_only_body(vector, filters, k, num_candidates, prefilter: bool) -> dict:
+    """Vector side of the hybrid query on its own, in either filter mode."""
+    knn = {"field": "embedding", "query_vector": vector, "k": k, "num_candidates": num_candidates}
+    if prefilter and filters:
+        knn["filter"] = filters
+    return {"size": k, "_source": False, "query": {"bool": {"filter": filters, "should": [{"knn": knn}]}}}
+
+
+def exact_body(vector, filters, k) -> dict:
+    """Brute-force cosine over the filtered subset: the recall ground truth."""
+    return {
+        "size": k,
+        "_source": False,
+        "query": {
+            "script_score": {
+                "query": {"bool": {"filter": filters}},
+                "script": {
+                    "source": "cosineSimilarity(params.query_vector, 'embedding') + 1.0",
+                    "params": {"query_vector": vector}
+                }
+            }
+        }
+    }
+
+
+# ----------------------------
+# Measurements
+# ----------------------------
+def timed_search(body, runs: int):
+    wall, took = [], []
+    res = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        res = es.search(index=INDEX_NAME, body=body, request_cache=False)
+        wall.append((time.perf_counter() - start) * 1000)
+        took.append(res["took"])
+    return res, float(np.median(wall)), float(np.median(took))
+
+
+def hit_ids(res) -> list[str]:
+    return [hit["_id"] for hit in res["hits"]["hits"]]
+
+
+# ----------------------------
+# Main
+# ----------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Pre- vs post-filtered kNN: latency and recall")
+    parser.add_argument("--k", type=int, default=200)
+    parser.add_argument("--num-candidates", type=int, default=500)
+    parser.add_argument("--size", type=int, default=10, help="hybrid result size")
+    parser.add_argument("--runs", type=int, default=5, help="timed runs per query (median reported)")
+    parser.add_argument("queries", nargs="*", default=SAMPLE_QUERIES)
+    args = parser.parse_args()
+
+    print(f"{'query':<34} {'mode':<5} {'hyb ms':>7} {'knn ms':>7} {'took':>5} {'vec hits':>8} {'recall':>7}")
+
+    totals = {"post": [], "pre": []}
+    for query in args.queries:
+        parsed = understand_query(query)
+        vector = get_query_vector(parsed.cleaned_query)
+        filters = build_filters(parsed)
+
+        exact = set(hit_ids(es.search(index=INDEX_NAME, body=exact_body(vector, filters, args.k))))
+
+        for mode, prefilter in [("post", False), ("pre", True)]:
+            _, hybrid_ms, _ = timed_search(
+                build_search_body(parsed, vector, args.size, prefilter, args.k, args.num_candidates), args.runs
+            )
+            res, knn_ms, took = timed_search(
+                knn_only_body(vector, filters, args.k, args.num_candidates, prefilter), args.runs
+            )
+
+            ids = hit_ids(res)
+            recall = len(exact.intersection(ids)) / len(exact) if exact else 1.0
+            totals[mode].append((hybrid_ms, knn_ms, recall))
+
+            print(f"{query[:34]:<34} {mode:<5} {hybrid_ms:>7.1f} {knn_ms:>7.1f} {took:>5} {len(ids):>8} {recall:>7.3f}")
+
+    print()
+    for mode, rows in totals.items():
+        hybrid_ms, knn_ms, recall = np.mean(rows, axis=0)
+        print(f"{mode}-filter mean: hybrid {hybrid_ms:.1f} ms, knn {knn_ms:.1f} ms, recall@{args.k} {recall:.3f}")
+
+
+if __name__ == "__main__":
+    main()
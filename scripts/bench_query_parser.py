@@ -0,0 +1,95 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import re
+import timeit
+from backend.query_parser import QueryParser
+from backend.search import (
+    resolve_brand_fuzzy, extract_max_price, extract_min_price, clean_query, brand_dictionary
+)
+
+
+SAMPLE_QUERIES = [
+    "campus shoes under 2000",
+    "Nike  running shoes for men",
+    "red saree for wedding above 1500 under 5000",
+    "puma tshirt for boys upto ₹ 999",
+    "womens kurta over 800",
+    "black leather wallet",
+    "adidas sneakers for women less than 4000",
+    "formal shirts for man",
+    "gold earrings for girls greater than 300",
+    "reebok track pants",
+]
+
+
+# ----------------------------
+# Implementations
+# ----------------------------
+def legacy_parse(query: str):
+    resolved_brand = resolve_brand_fuzzy(query)
+    resolved_max_price = extract_max_price(query)
+    resolved_min_price = extract_min_price(query)
+    cleaned = clean_query(query, resolved_brand, resolved_max_price, resolved_min_price)
+    return resolved_brand, resolved_min_price, resolved_max_price, cleaned
+
+
+def _legacy_brand(query: str):
+    brand = resolve_brand_fuzzy(query)
+    if not brand:
+        return None
+    # resolver contract: (brand, (start, end) span of the query to cut, confident)
+    m = re.search(rf"\b{re.escape(brand.lower())}\b", query)
+    return brand, (m.span() if m else None), True
+
+
+# same brand matcher as the legacy path so the outputs are comparable
+query_parser = QueryParser(_legacy_brand)
+
+
+def compiled_parse(query: str):
+    parsed = query_parser.parse(query)
+    return parsed.brand, parsed.min_price, parsed.max_price, parsed.cleaned_query
+
+
+def compiled_parse_uncached(query: str):
+    query_parser.clear_cache()
+    return compiled_parse(query)
+
+
+# ----------------------------
+# Main
+# ----------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Query understanding micro-benchmark")
+    parser.add_argument("--number", type=int, default=2000, help="passes over the sample queries")
+    args = parser.parse_args()
+
+    mismatches = [q for q in SAMPLE_QUERIES if legacy_parse(q) != compiled_parse(q)]
+    for q in mismatches:
+        print(f"MISMATCH {q!r}\n  legacy:   {legacy_parse(q)}\n  compiled: {compiled_parse(q)}")
+    print(f"{len(SAMPLE_QUERIES) - len(mismatches)}/{len(SAMPLE_QUERIES)} queries parse identically\n")
+
+    calls = args.number * len(SAMPLE_QUERIES)
+    results = {}
+    for name, fn in [
+        ("legacy", legacy_parse),
+        ("compiled (cold cache)", compiled_parse_uncached),
+        ("compiled (warm cache)", compiled_parse),
+    ]:
+        seconds = timeit.timeit(lambda: [fn(q) for q in SAMPLE_QUERIES], number=args.number)
+        results[name] = seconds / calls * 1e6
+
+    base = results["legacy"]
+    for name, us in results.items():
+        print(f"{name:<24} {us:>8.2f} us/query   {base / us:>6.1f}x")
+
+    brand_dictionary.ensure_loaded()
+    seconds = timeit.timeit(lambda: [brand_dictionary.match(q.lower()) for q in SAMPLE_QUERIES], number=args.number)
+    print(f"\ncatalog brand match ({len(brand_dictionary)} brands): {seconds / calls * 1e6:.2f} us/query")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import time
+import numpy as np
+from indexing.create_index import (
+    es, INDEX_NAME, VECTOR_INDEX_TYPES, VECTOR_INDEX_M, VECTOR_INDEX_EF_CONSTRUCTION,
+    vector_index_options, vector_bytes_per_doc, create_versioned_index, finalize_index
+)
+from indexing.embeddings import embed_text
+
+
+SAMPLE_QUERIES = [
+    "campus shoes",
+    "nike running shoes for men",
+    "red cotton saree for wedding",
+    "black leather wallet",
+    "women kurta set",
+    "denim jacket for boys",
+    "gold plated earrings",
+    "white sneakers",
+    "floral printed maxi dress",
+    "waterproof backpack for laptop",
+]
+
+
+# ----------------------------
+# Variants
+# ----------------------------
+def build_variant(name: str, index_options: dict) -> str:
+    """Copy the live alias into a fresh index with different vector options."""
+    es.options(ignore_status=404).indices.delete(index=name)
+    create_versioned_index(name, bulk=True, index_options=index_options)
+
+    start = time.perf_counter()
+    es.options(request_timeout=7200).reindex(
+        source={"index": INDEX_NAME}, dest={"index": name}, wait_for_completion=True, refresh=True
+    )
+    finalize_index(name)
+    print(f"  `{name}` built in {time.perf_counter() - start:.0f}s")
+    return name
+
+
+def store_bytes(name: str) -> int:
+    stats = es.indices.stats(index=name, metric="store")
+    return stats["_all"]["primaries"]["store"]["size_in_bytes"]
+
+
+# ----------------------------
+# Measurements
+# ----------------------------
+def knn_body(vector, k: int, num_candidates: int) -> dict:
+    return {
+        "size": k,
+        "_source": False,
+        "knn": {"field": "embedding", "query_vector": vector, "k": k, "num_candidates": num_candidates}
+    }
+
+
+def exact_body(vector, k: int) -> dict:
+    return {
+        "size": k,
+        "_source": False,
+        "query": {
+            "script_score": {
+                "query": {"match_all": {}},
+                "script": {
+                    "source": "cosineSimilarity(params.query_vector, 'embedding') + 1.0",
+                    "params": {"query_vector": vector}
+                }
+            }
+        }
+    }
+
+
+def hit_ids(res) -> list[str]:
+    return [hit["_id"] for hit in res["hits"]["hits"]]
+
+
+def measure(name: str, vectors, exact, k: int, num_candidates: int, runs: int):
+    timings, recalls = [], []
+    for vector, truth in zip(vectors, exact):
+        for _ in range(runs):
+            start = time.perf_counter()
+            res = es.search(index=name, body=knn_body(vector, k, num_candidates), request_cache=False)
+            timings.append((time.perf_counter() - start) * 1000)
+        recalls.append(len(truth.intersection(hit_ids(res))) / len(truth) if truth else 1.0)
+    return float(np.percentile(timings, 50)), float(np.percentile(timings, 99)), float(np.mean(recalls))
+
+
+# ----------------------------
+# Main
+# ----------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Build vector index variants side by side: size, kNN latency, recall")
+    parser.add_argument("--types", nargs="+", default=list(VECTOR_INDEX_TYPES), choices=list(VECTOR_INDEX_TYPES))
+    parser.add_argument("--m", type=int, default=VECTOR_INDEX_M)
+    parser.add_argument("--ef-construction", type=int, default=VECTOR_INDEX_EF_CONSTRUCTION)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--num-candidates", type=int, default=100)
+    parser.add_argument("--runs", type=int, default=10, help="timed runs per query")
+    parser.add_argument("--keep", action="store_true", help="keep the variant indices afterwards")
+    parser.add_argument("queries", nargs="*", default=SAMPLE_QUERIES)
+    args = parser.parse_args()
+
+    doc_count = es.count(index=INDEX_NAME)["count"]
+    vectors = [embed_text(q) for q in args.queries]
+    # ground truth from the live index: brute force, independent of its index_options
+    exact = [set(hit_ids(es.search(index=INDEX_NAME, body=exact_body(v, args.k)))) for v in vectors]
+
+    rows = []
+    for index_type in args.types:
+        options = vector_index_options(index_type, args.m, args.ef_construction)
+        name = f"{INDEX_NAME}_bench_{index_type}"
+        print(f"Building {index_type} (m={args.m}, ef_construction={args.ef_construction})")
+        try:
+            build_variant(name, options)
+            p50, p99, recall = measure(name, vectors, exact, args.k, args.num_candidates, args.runs)
+            offheap = vector_bytes_per_doc(options) * doc_count
+            rows.append((index_type, store_bytes(name), offheap, p50, p99, recall))
+        finally:
+            if not args.keep:
+                es.options(ignore_status=404).indices.delete(index=name)
+
+    print(f"\n{doc_count} docs, k={args.k}, num_candidates={args.num_candidates}")
+    print(f"{'type':<10} {'store MB':>9} {'off-heap MB':>12} {'p50 ms':>7} {'p99 ms':>7} {'recall':>7}")
+    for index_type, store, offheap, p50, p99, recall in rows:
+        print(f"{index_type:<10} {store / 2**20:>9.1f} {offheap / 2**20:>12.1f} {p50:>7.2f} {p99:>7.2f} {recall:>7.3f}")
+    print("\noff-heap MB is the estimated page cache needed for the vectors + HNSW graph")
+
+
+if __name__ == "__main__":
+    main()
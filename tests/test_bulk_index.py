@@ -0,0 +1,77 @@
+import json
+import os
+import threading
+from types import SimpleNamespace
+
+import pytest
+from elasticsearch import Elasticsearch
+from elastic_transport import ConnectionError as TransportConnectionError
+
+os.environ.setdefault("INDEX_NAME", "products-test")
+os.environ.setdefault("ELASTIC_PASSWORD", "test")
+
+from indexing import index_products  # noqa: E402
+
+
+class FlakyBulkClient(Elasticsearch):
+    """Real client whose bulk() fails once with a transport error and otherwise indexes everything."""
+
+    def __init__(self, fail_on_call: int):
+        super().__init__("http://localhost:9200")
+        self.fail_on_call = fail_on_call
+        self.calls = 0
+        self.sent = 0
+        self._calls_lock = threading.Lock()
+
+    def options(self, **kwargs):
+        return self
+
+    def bulk(self, *args, operations=None, **kwargs):
+        with self._calls_lock:
+            self.calls += 1
+            call = self.calls
+        if call == self.fail_on_call:
+            raise TransportConnectionError("connection reset")
+
+        headers = [json.loads(line) for line in operations[::2]]
+        self.sent += len(headers)
+        items = [{"index": {"_id": h["index"]["_id"], "status": 201}} for h in headers]
+        return SimpleNamespace(body={"errors": False, "items": items})
+
+
+def make_actions(n: int):
+    for i in range(n):
+        yield {"_op_type": "index", "_index": "products-test", "_id": str(i), "_source": {"n": i}}
+
+
+@pytest.mark.parametrize("helper", ["parallel", "streaming"])
+def test_transport_error_requeues_only_in_flight_actions(monkeypatch, helper):
+    client = FlakyBulkClient(fail_on_call=2)
+    monkeypatch.setattr(index_products, "es", client)
+    monkeypatch.setattr(index_products, "BULK_HELPER", helper)
+    monkeypatch.setattr(index_products, "BULK_CHUNK_SIZE", 10)
+    monkeypatch.setattr(index_products, "BULK_INITIAL_BACKOFF", 0)
+
+    results = list(index_products._bulk_results(make_actions(1000)))
+    requeued = [action for ok, info, action in results if not ok and index_products._is_retryable(info)]
+    indexed = {action["_id"] for ok, _, action in results if ok}
+
+    # the helper stops pulling actions after the error instead of draining the catalog
+    assert len(requeued) <= (index_products.BULK_THREAD_COUNT * 2 + 1) * 10
+    assert client.calls < 110
+    # every document is either indexed or handed back for retry, none twice as indexed
+    assert indexed | {a["_id"] for a in requeued} == {str(i) for i in range(1000)}
+    assert sum(1 for ok, _, _ in results if ok) == len(indexed)
+
+
+def test_bulk_index_retries_documents_hit_by_transport_error(monkeypatch):
+    client = FlakyBulkClient(fail_on_call=2)
+    monkeypatch.setattr(index_products, "es", client)
+    monkeypatch.setattr(index_products, "BULK_CHUNK_SIZE", 10)
+    monkeypatch.setattr(index_products, "BULK_INITIAL_BACKOFF", 0)
+    monkeypatch.setattr(index_products.time, "sleep", lambda _: None)
+
+    indexed, failures = index_products.bulk_index(make_actions(1000))
+
+    assert failures == []
+    assert indexed >= 1000